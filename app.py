@@ -1,13 +1,20 @@
 from flask import Flask
-from config import Config
-from extensions import db, login_manager
+from config import get_config
+from extensions import db, login_manager, apply_sqlite_pragmas
 from auth.routes import auth_bp
 from teacher.routes import teacher_bp
 from quiz.routes import quiz_bp
+from quiz.modes import load_modes
+from commands import register_commands
+from migrations import upgrade_schema
+from perf import install_perf
+from assets import install_assets
+from write_behind import install_write_behind
 
-def create_app():
+def create_app(config=None):
+    """`config` is a config class or a name from config.CONFIGS (default: $APP_CONFIG)."""
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config if isinstance(config, type) else get_config(config))
 
     db.init_app(app)
     login_manager.init_app(app)
@@ -16,8 +23,16 @@ def create_app():
     app.register_blueprint(teacher_bp, url_prefix="/teacher")
     app.register_blueprint(quiz_bp, url_prefix="/quiz")
 
+    load_modes(app)
+    install_assets(app)
+    register_commands(app)
+
     with app.app_context():
-        db.create_all()
+        apply_sqlite_pragmas(db.engine, app.config["SQLITE_PRAGMAS"])
+        upgrade_schema(log=app.logger.info)
+
+    install_perf(app)
+    install_write_behind(app)
 
     return app
 
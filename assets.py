@@ -0,0 +1,255 @@
+# assets.py
+# Fingerprinted static assets.
+#
+# build_assets() minifies the files in ASSETS, names each copy after a hash
+# of its content (css/style.3f2a9c1b7d4e.css) under static/dist/, and writes
+# .gz and, when the optional `brotli` package is installed, .br variants
+# next to it. static/dist/manifest.json maps the source names to the built
+# ones. create_app() rebuilds whatever changed on start (ASSETS_BUILD=1);
+# `flask build-assets` does the same for deploy scripts.
+#
+# Templates link assets with asset_url("js/quiz_client.js"), which falls
+# back to the plain static URL for anything not built. Built files are
+# served from /assets/ with a one-year immutable Cache-Control, in the best
+# encoding the browser accepts. A changed file gets a new name, so browsers
+# never need to revalidate.
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import abort, current_app, request, send_file, url_for
+
+ASSETS = ("css/style.css", "js/quiz_client.js")
+DIST = "dist"
+MANIFEST = "manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+# --- minifiers -------------------------------------------------------------
+
+def minify_css(src):
+    src = re.sub(r"/\*.*?\*/", "", src, flags=re.S)
+    src = re.sub(r"\s+", " ", src)
+    src = re.sub(r"\s*([{};,>])\s*", r"\1", src)
+    return src.replace(";}", "}").strip()
+
+
+# A '/' after one of these (or at the start) begins a regex literal, not a division
+_REGEX_PREFIX = set("(,=:[!&|?{};+-*%<>~^")
+
+
+def _skip_string(src, i):
+    """Index just past the quoted string starting at src[i]."""
+    quote, i = src[i], i + 1
+    while i < len(src) and src[i] != quote:
+        i += 2 if src[i] == "\\" else 1
+    return i + 1
+
+
+def _skip_template(src, i):
+    """Index just past the template literal starting at src[i], ${...} included."""
+    i += 1
+    while i < len(src) and src[i] != "`":
+        if src[i] == "\\":
+            i += 2
+        elif src.startswith("${", i):
+            i, depth = i + 2, 1
+            while i < len(src) and depth:
+                c = src[i]
+                if c in "'\"":
+                    i = _skip_string(src, i)
+                    continue
+                if c == "`":
+                    i = _skip_template(src, i)
+                    continue
+                depth += (c == "{") - (c == "}")
+                i += 1
+        else:
+            i += 1
+    return i + 1
+
+
+def _skip_regex(src, i):
+    i, in_class = i + 1, False
+    while i < len(src):
+        c = src[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            break
+        i += 1
+    i += 1
+    while i < len(src) and src[i].isalpha():  # flags
+        i += 1
+    return i
+
+
+def minify_js(src):
+    """
+    Drop comments, indentation and blank lines. Line breaks are kept so
+    automatic semicolon insertion sees the same code; strings, template
+    literals and regex literals are copied untouched.
+    """
+    out, i, n = [], 0, len(src)
+    last = ""   # last significant character emitted
+    while i < n:
+        c = src[i]
+        if c in "'\"":
+            j = _skip_string(src, i)
+        elif c == "`":
+            j = _skip_template(src, i)
+        elif src.startswith("//", i):
+            i = src.find("\n", i)
+            i = n if i < 0 else i
+            continue
+        elif src.startswith("/*", i):
+            end = src.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            if out and out[-1] not in " \n":
+                out.append(" ")
+            continue
+        elif c == "/" and (not last or last in _REGEX_PREFIX):
+            j = _skip_regex(src, i)
+        elif c.isspace():
+            j = i
+            while j < n and src[j].isspace():
+                j += 1
+            sep = "\n" if "\n" in src[i:j] else " "
+            if out and out[-1] in " \n":
+                if sep == "\n":
+                    out[-1] = "\n"
+            elif out:
+                out.append(sep)
+            i = j
+            continue
+        else:
+            j = i + 1
+        out.append(src[i:j])
+        last = src[j - 1]
+        i = j
+    return "".join(out).strip() + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+# --- build -----------------------------------------------------------------
+
+def _write(path, data):
+    # Write-then-rename, so a worker never serves a half-written file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_assets(static_folder, force=False):
+    """Build every asset whose source changed; returns {source name: built name}."""
+    manifest = load_manifest(static_folder)
+    changed = False
+    for name in ASSETS:
+        with open(os.path.join(static_folder, name), "rb") as fh:
+            source = fh.read()
+        source_hash = hashlib.sha256(source).hexdigest()
+        entry = manifest.get(name)
+        built_path = os.path.join(static_folder, DIST, entry["file"]) if entry else None
+        if not force and entry and entry["source"] == source_hash and os.path.exists(built_path):
+            continue
+
+        base, ext = os.path.splitext(name)
+        minify = MINIFIERS.get(ext)
+        data = minify(source.decode("utf-8")).encode("utf-8") if minify else source
+        built = f"{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        path = os.path.join(static_folder, DIST, built)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        _write(path, data)
+        _write(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(path + ".br", brotli.compress(data, quality=11))
+
+        # Drop the previous build of this asset
+        if entry and entry["file"] != built:
+            for suffix in ("", ".gz", ".br"):
+                try:
+                    os.remove(os.path.join(static_folder, DIST, entry["file"] + suffix))
+                except OSError:
+                    pass
+
+        manifest[name] = {"file": built, "source": source_hash,
+                          "bytes": len(source), "minified": len(data)}
+        changed = True
+
+    if changed:
+        os.makedirs(os.path.join(static_folder, DIST), exist_ok=True)
+        _write(os.path.join(static_folder, DIST, MANIFEST),
+               json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return {name: entry["file"] for name, entry in manifest.items()}
+
+
+# --- serving ---------------------------------------------------------------
+
+def asset_url(filename, **values):
+    """url_for('static', filename=...) that points at the built copy when there is one."""
+    built = current_app.extensions.get("assets", {}).get(filename)
+    if built:
+        return url_for("serve_asset", filename=built, **values)
+    return url_for("static", filename=filename, **values)
+
+
+def serve_asset(filename):
+    if filename not in current_app.extensions.get("assets", {}).values():
+        abort(404)
+    path = os.path.join(current_app.static_folder, DIST, filename)
+    accepted = request.headers.get("Accept-Encoding", "")
+
+    encoding = None
+    for enc, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if enc in accepted and os.path.exists(path + suffix):
+            encoding, path = enc, path + suffix
+            break
+
+    response = send_file(path, mimetype=mimetypes.guess_type(filename)[0],
+                         max_age=31536000, conditional=True)
+    response.headers["Cache-Control"] = IMMUTABLE
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def install_assets(app):
+    """Build changed assets (ASSETS_BUILD) and expose asset_url() and /assets/."""
+    built = None
+    if app.config.get("ASSETS_BUILD"):
+        try:
+            built = build_assets(app.static_folder)
+        except OSError as e:  # e.g. a read-only deploy: serve the last build, if any
+            app.logger.warning(f"Static asset build skipped: {e}")
+    if built is None:
+        built = {name: e["file"] for name, e in load_manifest(app.static_folder).items()}
+    app.extensions["assets"] = built
+    app.add_url_rule("/assets/<path:filename>", "serve_asset", serve_asset)
+    app.add_template_global(asset_url)
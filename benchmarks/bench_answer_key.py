@@ -0,0 +1,86 @@
+# benchmarks/bench_answer_key.py
+# Microbenchmark: per-submit answer checking, legacy path vs compiled answer keys.
+# Run with: python benchmarks/bench_answer_key.py [num_questions] [num_submits]
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_answer_key.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import Question
+from quiz.scoring import answer_keys, is_correct
+
+
+def legacy_check(qid, sel_list):
+    """The scoring code submit_answer_api ran before the answer-key cache."""
+    q = Question.query.get(qid)
+    try: opts = json.loads(q.options_json or "[]")
+    except: opts = []
+    id_map = {str(o['id']): str(o.get('text','')).lower() for o in opts}
+
+    raw = [str(x).strip() for x in (q.correct_answers or "").split(",") if x.strip()]
+    correct_set = set()
+    for r in raw:
+        if r in id_map: correct_set.add(id_map[r])
+        else: correct_set.add(r.lower())
+
+    user_set = set()
+    for u in sel_list:
+        if u in id_map: user_set.add(id_map[u])
+        else: user_set.add(u.lower())
+    return user_set == correct_set
+
+
+def cached_check(qid, sel_list):
+    return is_correct(answer_keys.get(qid), sel_list)
+
+
+def run(fn, submits):
+    # Each submit is its own request, so it gets a fresh session
+    start = time.perf_counter()
+    for qid, sel in submits:
+        fn(qid, sel)
+        db.session.remove()
+    return time.perf_counter() - start
+
+
+def main():
+    n_questions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_submits = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    app = create_app()
+    with app.app_context():
+        for i in range(n_questions):
+            opts = [{"id": str(k), "text": f"Option {k} of question {i}"} for k in range(1, 5)]
+            db.session.add(Question(prompt=f"Question {i}", options_json=json.dumps(opts),
+                                    correct_answers=str(random.randint(1, 4)),
+                                    difficulty=random.randint(1, 10)))
+        db.session.commit()
+
+        ids = [qid for (qid,) in db.session.query(Question.id)]
+        submits = [(random.choice(ids), [str(random.randint(1, 4))]) for _ in range(n_submits)]
+
+        # Both paths must agree before we time them
+        for qid, sel in submits[:500]:
+            assert legacy_check(qid, sel) == cached_check(qid, sel)
+
+        answer_keys.invalidate()
+        legacy = run(legacy_check, submits)
+        cached = run(cached_check, submits)
+
+    print(f"questions={n_questions} submits={n_submits}")
+    print(f"legacy: {legacy:.3f}s  ({legacy / n_submits * 1e6:.1f} us/submit)")
+    print(f"cached: {cached:.3f}s  ({cached / n_submits * 1e6:.1f} us/submit)")
+    print(f"speedup: {legacy / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
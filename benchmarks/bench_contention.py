@@ -0,0 +1,157 @@
+# benchmarks/bench_contention.py
+# Answer-submit throughput while teachers read analytics, once per config
+# profile. Writer threads play adaptive attempts through /quiz/api/*;
+# reader threads poll /teacher/analytics/data over a large attempt table.
+# Each profile gets its own fresh SQLite file.
+# Run with: python benchmarks/bench_contention.py [--writers 8] [--readers 2] [--seconds 10]
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import get_config
+from extensions import db
+from models import Attempt, Question, Role, User, prompt_hash
+from quiz.modes.common import bump_bank_revision
+
+BATCH = 50000
+MODES = ["adaptive", "challenger", "minuterush", "firststrike", "levelinfinity"]
+
+
+def seed(n_students, n_questions, n_attempts):
+    rng = random.Random(1)
+    db.session.bulk_insert_mappings(Question, [{
+        "prompt": f"Contention question {i}",
+        "prompt_hash": prompt_hash(f"Contention question {i}"),
+        "options_json": json.dumps([{"id": str(k), "text": f"Option {k}"} for k in range(1, 5)]),
+        "correct_answers": str(rng.randint(1, 4)),
+        "difficulty": rng.randint(1, 10),
+        "qtype": "single",
+    } for i in range(n_questions)])
+    teacher = User(username="teacher", role=Role.TEACHER, password_hash="x")
+    db.session.add(teacher)
+    db.session.bulk_insert_mappings(User, [
+        {"username": f"student{i:04d}", "password_hash": "x", "role": Role.STUDENT}
+        for i in range(n_students)
+    ])
+    db.session.commit()
+
+    ids = [uid for (uid,) in db.session.query(User.id).filter(User.role == Role.STUDENT)]
+    # History for the analytics aggregates to chew through
+    for start in range(0, n_attempts, BATCH):
+        db.session.bulk_insert_mappings(Attempt, [
+            {"user_id": rng.choice(ids), "mode": rng.choice(MODES), "score": rng.randint(0, 30)}
+            for _ in range(min(BATCH, n_attempts - start))
+        ])
+        db.session.commit()
+    bump_bank_revision()
+    db.session.commit()
+    return teacher.id, ids
+
+
+def writer(app, user_id, deadline, out):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+    rng = random.Random(user_id)
+    while time.perf_counter() < deadline:
+        r = client.post("/quiz/api/start_attempt", json={"mode": "adaptive"})
+        if r.status_code != 200:
+            out["errors"] += 1
+            continue
+        aid = r.get_json()["attempt_id"]
+        while time.perf_counter() < deadline:
+            q = client.post("/quiz/api/get_question", json={"attempt_id": aid})
+            if q.status_code != 200:
+                out["errors"] += 1
+                break
+            q = q.get_json()
+            if q.get("finished"):
+                break
+            start = time.perf_counter()
+            r = client.post("/quiz/api/submit_answer", json={
+                "attempt_id": aid, "question_id": q["id"],
+                "selected": [rng.choice(q["options"])["id"]], "time_used": 2})
+            elapsed = time.perf_counter() - start
+            if r.status_code != 200:
+                out["errors"] += 1
+                break
+            out["latencies"].append(elapsed)
+            if r.get_json().get("finished"):
+                break
+
+
+def reader(app, teacher_id, deadline, out):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(teacher_id)
+    while time.perf_counter() < deadline:
+        r = client.get("/teacher/analytics/data")
+        out["reads"] += 1 if r.status_code == 200 else 0
+        out["errors"] += 0 if r.status_code == 200 else 1
+
+
+def run(profile, args):
+    db_path = os.path.join(tempfile.mkdtemp(), f"contention_{profile}.db")
+    config = type(f"Bench{profile.title()}Config", (get_config(profile),),
+                  {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}"})
+    app = create_app(config)
+    with app.app_context():
+        teacher_id, ids = seed(args.writers, args.questions, args.attempts)
+        journal = db.session.execute(db.text("PRAGMA journal_mode")).scalar()
+    app.logger.disabled = True  # "database is locked" tracebacks would swamp the report
+
+    writes = [{"latencies": [], "errors": 0} for _ in range(args.writers)]
+    reads = [{"reads": 0, "errors": 0} for _ in range(args.readers)]
+    deadline = time.perf_counter() + args.seconds
+    threads = ([threading.Thread(target=writer, args=(app, uid, deadline, out))
+                for uid, out in zip(ids, writes)] +
+               [threading.Thread(target=reader, args=(app, teacher_id, deadline, out))
+                for out in reads])
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies = sorted(x for w in writes for x in w["latencies"])
+    p = lambda pct: latencies[min(len(latencies) - 1, int(pct / 100 * len(latencies)))] * 1e3 if latencies else 0
+    return {
+        "profile": profile, "journal_mode": journal,
+        "submits_per_s": round(len(latencies) / args.seconds, 1),
+        "submit_p50_ms": round(p(50), 1), "submit_p95_ms": round(p(95), 1),
+        "submit_max_ms": round(latencies[-1] * 1e3, 1) if latencies else 0,
+        "write_errors": sum(w["errors"] for w in writes),
+        "analytics_reads_per_s": round(sum(r["reads"] for r in reads) / args.seconds, 1),
+        "read_errors": sum(r["errors"] for r in reads),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--attempts", type=int, default=300000, help="seeded history for analytics")
+    parser.add_argument("--profiles", default="development,production")
+    args = parser.parse_args()
+
+    for profile in args.profiles.split(","):
+        r = run(profile.strip(), args)
+        print(f"{r['profile']:<12} journal={r['journal_mode']:<7} "
+              f"submits {r['submits_per_s']}/s (p50 {r['submit_p50_ms']} ms, "
+              f"p95 {r['submit_p95_ms']} ms, max {r['submit_max_ms']} ms, "
+              f"{r['write_errors']} errors)  analytics {r['analytics_reads_per_s']}/s "
+              f"({r['read_errors']} errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_dashboard.py
+# Teacher dashboard latency with a large roster: first page, a deep page and
+# a search, each rendered through the test client.
+# Run with: python benchmarks/bench_dashboard.py [num_students] [num_attempts]
+
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_dashboard.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import User, Role, Attempt
+
+BATCH = 50000
+
+
+def seed(n_students, n_attempts):
+    teacher = User(username="teacher", role=Role.TEACHER, password_hash="x")
+    db.session.add(teacher)
+    db.session.bulk_insert_mappings(User, [
+        {"username": f"student{i:06d}", "password_hash": "x", "role": Role.STUDENT}
+        for i in range(n_students)
+    ])
+    db.session.commit()
+
+    ids = [uid for (uid,) in db.session.query(User.id).filter(User.role == Role.STUDENT)]
+    modes = ["adaptive", "challenger", "minuterush", "firststrike", "levelinfinity"]
+    for start in range(0, n_attempts, BATCH):
+        db.session.bulk_insert_mappings(Attempt, [
+            {"user_id": random.choice(ids), "mode": random.choice(modes),
+             "score": random.randint(0, 30)}
+            for _ in range(min(BATCH, n_attempts - start))
+        ])
+        db.session.commit()
+    return teacher.id
+
+
+def timed(client, url, repeat=20):
+    client.get(url)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        r = client.get(url)
+        assert r.status_code == 200, (url, r.status_code)
+    return (time.perf_counter() - start) / repeat * 1e3, r.data.decode()
+
+
+def main():
+    n_students = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    n_attempts = int(sys.argv[2]) if len(sys.argv) > 2 else 500000
+
+    app = create_app()
+    with app.app_context():
+        teacher_id = seed(n_students, n_attempts)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(teacher_id)
+
+    first, html = timed(client, "/teacher/dashboard")
+    # Walk a few pages in, then time that cursor
+    for _ in range(5):
+        cursor = re.search(r'next=([^&"]+)', html).group(1)
+        html = client.get(f"/teacher/dashboard?next={cursor}").data.decode()
+    deep, _ = timed(client, f"/teacher/dashboard?next={cursor}")
+    search, _ = timed(client, "/teacher/dashboard?q=student0123")
+
+    print(f"students={n_students} attempts={n_attempts}")
+    print(f"first page:  {first:.1f} ms")
+    print(f"deep page:   {deep:.1f} ms")
+    print(f"search:      {search:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_student_import.py
+# Bulk student import: the legacy per-row loop (one lookup + one serial hash
+# per student) vs import_students (batched lookups, process-pool hashing).
+# Run with: python benchmarks/bench_student_import.py [num_students] [workers]
+
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_student_import.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import User, Role
+from student_import import import_students
+
+
+def legacy_import(rows):
+    """The loop upload_students_excel ran before student_import."""
+    added, skipped = 0, 0
+    for i, row in rows:
+        if i == 1: continue
+        r = list(row) + [None] * 2
+        uname = str(r[0]).strip() if r[0] else None
+        pwd = str(r[1]).strip() if r[1] else None
+        if not uname or not pwd:
+            continue
+        if User.query.filter_by(username=uname).first():
+            skipped += 1
+            continue
+        s = User(username=uname, role=Role.STUDENT)
+        s.set_password(pwd)
+        db.session.add(s)
+        added += 1
+    return added
+
+
+def sheet(prefix, n):
+    yield 1, ("Username", "Password")
+    for i in range(n):
+        yield i + 2, (f"{prefix}{i}", f"pw-{i}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        legacy_added = legacy_import(sheet("legacy", n))
+        db.session.commit()
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        report = import_students(sheet("batched", n), workers=workers)
+        db.session.commit()
+        batched = time.perf_counter() - start
+
+        assert legacy_added == report.added == n
+
+        # Hashes from the pool must verify like serially created ones
+        u = User.query.filter_by(username="batched0").first()
+        assert u.check_password("pw-0")
+
+    print(f"students={n} workers={workers or os.cpu_count()}")
+    print(f"legacy:  {legacy:.2f}s  ({legacy / n * 1e3:.1f} ms/student)")
+    print(f"batched: {batched:.2f}s  ({batched / n * 1e3:.1f} ms/student)")
+    print(f"speedup: {legacy / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
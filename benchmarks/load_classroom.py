@@ -0,0 +1,307 @@
+# benchmarks/load_classroom.py
+# Classroom load test: a roster of simulated students plays all five modes
+# at once through the real /quiz/api/* endpoints, the way static/js/quiz_client.js
+# does (bundles and batch submits for prefetch modes, submit-and-next otherwise).
+#
+# Against the Flask test client (temp database, seeded here, SQL counted):
+#   python benchmarks/load_classroom.py --students 300 --out before.json
+#
+# Against a running server:
+#   python benchmarks/load_classroom.py --seed-db /tmp/classroom.db --students 300
+#   DATABASE_URL=sqlite:////tmp/classroom.db flask run            (other shell)
+#   python benchmarks/load_classroom.py --url http://127.0.0.1:5000 --students 300
+#
+# The JSON report (throughput, p50/p95/p99 per endpoint and per mode, SQL
+# statements per request) is stable across runs so two versions can be diffed.
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ["adaptive", "challenger", "minuterush", "firststrike", "levelinfinity"]
+PREFETCH_MODES = {"minuterush", "levelinfinity"}
+PASSWORD = "bench"
+
+
+def seed(n_students, n_questions):
+    """Synthetic bank and roster in the configured database. Returns user ids by username."""
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from extensions import db
+    from models import Question, User, Role, prompt_hash
+    from quiz.modes.common import bump_bank_revision
+
+    app = create_app()
+    with app.app_context():
+        rng = random.Random(1)
+        # Bulk inserts skip the model's validators: set prompt_hash like an upload would
+        db.session.bulk_insert_mappings(Question, [{
+            "prompt": f"Benchmark question {i}",
+            "prompt_hash": prompt_hash(f"Benchmark question {i}"),
+            "options_json": json.dumps([{"id": str(k), "text": f"Option {k} of {i}"} for k in range(1, 5)]),
+            "correct_answers": str(rng.randint(1, 4)),
+            "difficulty": rng.randint(1, 10),
+            "qtype": "single",
+        } for i in range(n_questions)])
+        # One hash for the whole roster; seeding shouldn't take longer than the run
+        pw_hash = generate_password_hash(PASSWORD)
+        db.session.bulk_insert_mappings(User, [
+            {"username": f"bench{i:04d}", "password_hash": pw_hash, "role": Role.STUDENT}
+            for i in range(n_students)
+        ])
+        bump_bank_revision()
+        db.session.commit()
+        users = dict(db.session.query(User.username, User.id)
+                     .filter(User.username.like("bench%")))
+    return app, users
+
+
+# --- transports ---------------------------------------------------------------
+
+class TestClientTransport:
+    """In-process requests; the session is set directly instead of logging in."""
+
+    def __init__(self, app, user_id):
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess["_user_id"] = str(user_id)
+
+    def post(self, path, body):
+        r = self.client.post(path, json=body)
+        return r.status_code, r.get_json(silent=True)
+
+
+class HttpTransport:
+    """Real HTTP with a cookie jar per student."""
+
+    def __init__(self, base_url, username):
+        self.base = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        form = urllib.parse.urlencode({"username": username, "password": PASSWORD}).encode()
+        self.opener.open(self.base + "/login", data=form).read()
+
+    def post(self, path, body):
+        req = urllib.request.Request(self.base + path, data=json.dumps(body).encode(),
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with self.opener.open(req) as resp:
+                return resp.status, json.loads(resp.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+# --- measurement --------------------------------------------------------------
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)    # (mode, endpoint) -> [seconds]
+        self.errors = defaultdict(int)      # (mode, endpoint) -> count
+        self.sql = defaultdict(int)         # (mode, endpoint) -> statements
+        self.local = threading.local()      # label of the request running on this thread
+
+    def call(self, transport, mode, endpoint, body):
+        self.local.label = (mode, endpoint)
+        start = time.perf_counter()
+        try:
+            status, data = transport.post(f"/quiz/api/{endpoint}", body)
+        except Exception:
+            status, data = 599, None
+        elapsed = time.perf_counter() - start
+        self.local.label = None
+        with self.lock:
+            self.samples[(mode, endpoint)].append(elapsed)
+            if status >= 400:
+                self.errors[(mode, endpoint)] += 1
+        return data if status < 400 else None
+
+    def count_sql(self, *args):
+        label = getattr(self.local, "label", None)
+        if label:
+            with self.lock:
+                self.sql[label] += 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    i = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[i]
+
+
+def summarize(samples, errors, sql, wall, count_sql):
+    def block(values, errs, stmts):
+        values = sorted(values)
+        return {
+            "requests": len(values),
+            "errors": errs,
+            "throughput_rps": round(len(values) / wall, 2) if wall else None,
+            "p50_ms": round(percentile(values, 50) * 1e3, 2) if values else None,
+            "p95_ms": round(percentile(values, 95) * 1e3, 2) if values else None,
+            "p99_ms": round(percentile(values, 99) * 1e3, 2) if values else None,
+            "sql_per_request": round(stmts / len(values), 2) if (count_sql and values) else None,
+        }
+
+    by_endpoint, by_mode = defaultdict(list), defaultdict(list)
+    err_endpoint, err_mode = defaultdict(int), defaultdict(int)
+    sql_endpoint, sql_mode = defaultdict(int), defaultdict(int)
+    for (mode, endpoint), values in samples.items():
+        by_endpoint[endpoint] += values
+        by_mode[mode] += values
+        err_endpoint[endpoint] += errors[(mode, endpoint)]
+        err_mode[mode] += errors[(mode, endpoint)]
+        sql_endpoint[endpoint] += sql[(mode, endpoint)]
+        sql_mode[mode] += sql[(mode, endpoint)]
+
+    all_values = [v for values in samples.values() for v in values]
+    return {
+        "overall": block(all_values, sum(errors.values()), sum(sql.values())),
+        "per_endpoint": {e: block(v, err_endpoint[e], sql_endpoint[e])
+                         for e, v in sorted(by_endpoint.items())},
+        "per_mode": {m: block(v, err_mode[m], sql_mode[m]) for m, v in sorted(by_mode.items())},
+        "per_mode_endpoint": {f"{m}/{e}": block(v, errors[(m, e)], sql[(m, e)])
+                              for (m, e), v in sorted(samples.items())},
+    }
+
+
+# --- simulated student -----------------------------------------------------------
+
+def play(rec, transport, mode, max_questions, think, rng):
+    started = rec.call(transport, mode, "start_attempt", {"mode": mode})
+    if not started:
+        return
+    aid = started["attempt_id"]
+    answered, q = 0, None
+
+    def answer(q):
+        opts = q.get("options") or [{"id": "1"}]
+        return {"question_id": q["id"], "selected": [str(rng.choice(opts)["id"])],
+                "time_used": round(rng.uniform(1, 8), 2)}
+
+    while answered < max_questions:
+        if think:
+            time.sleep(think)
+        if mode in PREFETCH_MODES:
+            bundle = rec.call(transport, mode, "get_questions",
+                              {"attempt_id": aid, "count": min(5, max_questions - answered)})
+            if not bundle or bundle.get("finished"):
+                break
+            answers = [answer(q) for q in bundle["questions"]]
+            if not rec.call(transport, mode, "submit_answers", {"attempt_id": aid, "answers": answers}):
+                break
+            answered += len(answers)
+        else:
+            # The first question is fetched; each answer brings back the next
+            if q is None:
+                q = rec.call(transport, mode, "get_question", {"attempt_id": aid})
+            if not q or q.get("finished"):
+                break
+            result = rec.call(transport, mode, "submit_and_next", dict(answer(q), attempt_id=aid))
+            answered += 1
+            if not result or result.get("finished"):
+                break
+            if mode == "challenger" and not result.get("correct"):
+                break
+            q = result.get("next")
+
+    rec.call(transport, mode, "end_attempt", {"attempt_id": aid})
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1] if __doc__ else None)
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=500, help="bank size to seed")
+    parser.add_argument("--questions-per-attempt", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50, help="students playing at once")
+    parser.add_argument("--think-ms", type=int, default=0, help="pause before each question")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--url", help="run against this server instead of the test client")
+    parser.add_argument("--seed-db", help="seed this SQLite file for a --url run and exit")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    rng = random.Random(args.seed)
+
+    if args.seed_db:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.seed_db)}"
+        seed(args.students, args.questions)
+        print(f"Seeded {args.students} students and {args.questions} questions into {args.seed_db}")
+        return
+
+    rec = Recorder()
+    roster = [f"bench{i:04d}" for i in range(args.students)]
+    if args.url:
+        transports = [HttpTransport(args.url, name) for name in roster]
+    else:
+        db_path = os.path.join(tempfile.mkdtemp(), "load_classroom.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        app, users = seed(args.students, args.questions)
+
+        from sqlalchemy import event
+        from extensions import db
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", rec.count_sql)
+        transports = [TestClientTransport(app, users[name]) for name in roster]
+
+    jobs = [(t, modes[i % len(modes)], random.Random(rng.random())) for i, t in enumerate(transports)]
+    think = args.think_ms / 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for f in [pool.submit(play, rec, t, mode, args.questions_per_attempt, think, r)
+                  for t, mode, r in jobs]:
+            f.result()
+    wall = time.perf_counter() - start
+
+    report = {
+        "config": {
+            "students": args.students, "questions": args.questions,
+            "questions_per_attempt": args.questions_per_attempt,
+            "concurrency": args.concurrency, "think_ms": args.think_ms,
+            "modes": modes, "target": args.url or "test-client", "seed": args.seed,
+        },
+        "git_revision": git_revision(),
+        "wall_seconds": round(wall, 3),
+        **summarize(rec.samples, rec.errors, rec.sql, wall, count_sql=not args.url),
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+        o = report["overall"]
+        print(f"{o['requests']} requests in {wall:.1f}s ({o['throughput_rps']} req/s), "
+              f"p50 {o['p50_ms']} ms, p95 {o['p95_ms']} ms, p99 {o['p99_ms']} ms, "
+              f"{o['errors']} errors -> {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
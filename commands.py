@@ -0,0 +1,256 @@
+# commands.py
+# Maintenance commands, available through the flask CLI (FLASK_APP=app.py):
+#   flask backfill-events
+#   flask rebuild-question-stats
+#   flask rebuild-user-stats
+#   flask rebuild-leaderboards
+#   flask analyze-items [--write-back]
+#   flask upgrade-db
+#   flask build-assets
+#   flask export events --format jsonl --gzip -o events.jsonl.gz
+#   flask check-query-plans
+
+import json
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from extensions import db
+from assets import build_assets
+from export import FORMATS, KINDS, export_stream
+from migrations import upgrade_schema
+from models import (Attempt, AttemptEvent, ItemCalibration, LeaderboardEntry, Question,
+                    QuestionStats, User, UserStats, ATTEMPT_ORDER)
+from quiz.modes.common import bump_bank_revision
+
+
+def _parse_ts(raw):
+    try:
+        return datetime.fromisoformat(raw) if raw else None
+    except (TypeError, ValueError):
+        return None
+
+
+@click.command("backfill-events")
+@click.option("--batch-size", default=500, show_default=True)
+@with_appcontext
+def backfill_events_command(batch_size):
+    """Move answer events out of Attempt.details into the AttemptEvent table."""
+    moved, attempts = 0, 0
+    last_id = 0
+
+    while True:
+        batch = (Attempt.query
+                 .filter(Attempt.id > last_id, Attempt.details.isnot(None))
+                 .order_by(Attempt.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+
+        for a in batch:
+            last_id = a.id
+            try:
+                details = json.loads(a.details)
+            except Exception:
+                continue
+            if not isinstance(details, list):
+                continue
+
+            answers = [d for d in details if isinstance(d, dict) and d.get("qid")]
+            if not answers:
+                continue
+            rest = [d for d in details if not (isinstance(d, dict) and d.get("qid"))]
+
+            for d in answers:
+                a.add_event(d.get("qid"), d.get("correct"),
+                            time_used=d.get("time_used"),
+                            difficulty=d.get("difficulty"),
+                            selected=d.get("selected"),
+                            timestamp=_parse_ts(d.get("timestamp")) or a.ended_at or a.started_at)
+            # Keep only the non-answer records (start params) in details
+            a.details = json.dumps(rest, ensure_ascii=False) if rest else None
+            moved += len(answers)
+            attempts += 1
+
+        db.session.commit()
+
+    click.echo(f"✅ Backfilled {moved} events from {attempts} attempts")
+
+
+@click.command("rebuild-question-stats")
+@with_appcontext
+def rebuild_question_stats_command():
+    """Recompute QuestionStats from scratch out of AttemptEvent."""
+    QuestionStats.query.delete()
+    select = db.session.query(
+        AttemptEvent.qid,
+        db.func.count(AttemptEvent.id),
+        db.func.sum(db.cast(AttemptEvent.correct, db.Integer)),
+        db.func.sum(db.func.coalesce(AttemptEvent.time_used, 0.0)),
+        db.func.max(AttemptEvent.timestamp),
+    ).group_by(AttemptEvent.qid)
+    db.session.execute(db.insert(QuestionStats).from_select(
+        ["qid", "seen", "correct", "time_sum", "last_seen"], select))
+    db.session.commit()
+    click.echo(f"✅ Rebuilt stats for {QuestionStats.query.count()} questions")
+
+
+@click.command("rebuild-user-stats")
+@click.option("--idle-minutes", default=60, show_default=True,
+              help="Close unfinished attempts with no activity for this long first.")
+@with_appcontext
+def rebuild_user_stats_command(idle_minutes):
+    """Recompute UserStats and leaderboards from closed attempts."""
+    # Abandoned attempts (closed tab, lost connection) never reach end_attempt
+    cutoff = datetime.utcnow() - timedelta(minutes=idle_minutes)
+    last_activity = db.func.coalesce(Attempt.ended_at, Attempt.started_at)
+    closed = (Attempt.query
+              .filter(Attempt.closed_at.is_(None), last_activity < cutoff)
+              .update({Attempt.closed_at: last_activity}, synchronize_session=False))
+    UserStats.rebuild()
+    LeaderboardEntry.rebuild()
+    db.session.commit()
+    click.echo(f"✅ Closed {closed} idle attempts, rebuilt stats for "
+               f"{UserStats.query.filter_by(mode=UserStats.ALL_MODES).count()} students")
+
+
+@click.command("rebuild-leaderboards")
+@click.option("--prune", is_flag=True, help="Also drop the boards of past days and weeks.")
+@with_appcontext
+def rebuild_leaderboards_command(prune):
+    """Recompute leaderboard entries from closed attempts."""
+    LeaderboardEntry.rebuild()
+    pruned = LeaderboardEntry.prune(datetime.utcnow()) if prune else 0
+    db.session.commit()
+    click.echo(f"✅ Rebuilt {LeaderboardEntry.query.count()} leaderboard entries"
+               + (f", pruned {pruned}" if prune else ""))
+
+
+@click.command("analyze-items")
+@click.option("--min-responses", default=None, type=int,
+              help="Students needed before a question gets a calibrated level.")
+@click.option("--write-back", is_flag=True, help="Set Question.difficulty to the calibrated level.")
+@with_appcontext
+def analyze_items_command(min_responses, write_back):
+    """Item analysis (p-value, point-biserial, distractors, Rasch difficulty). Needs numpy."""
+    try:
+        from item_analysis import MIN_RESPONSES, analyze_items
+    except ImportError:
+        raise click.ClickException("analyze-items needs numpy (pip install numpy)")
+
+    report = analyze_items(MIN_RESPONSES if min_responses is None else min_responses)
+    changed = ItemCalibration.apply() if write_back else 0
+    bump_bank_revision()  # workers re-read item difficulties and levels
+    db.session.commit()
+    click.echo(f"✅ {report.questions} questions, {report.students} students, "
+               f"{report.responses} responses ({report.events} events) in {report.seconds:.1f}s; "
+               f"{report.calibrated} calibrated, Rasch fit in {report.iterations} iterations"
+               + (f"; {changed} difficulties updated" if write_back else ""))
+
+
+@click.command("upgrade-db")
+@with_appcontext
+def upgrade_db_command():
+    """Run pending schema migrations (create_app also does this on start)."""
+    version = upgrade_schema(log=click.echo)
+    click.echo(f"✅ Schema at v{version}")
+
+
+@click.command("build-assets")
+@click.option("--force", is_flag=True, help="Rebuild even if the sources did not change.")
+@with_appcontext
+def build_assets_command(force):
+    """Minify, fingerprint and precompress the static assets."""
+    built = build_assets(current_app.static_folder, force=force)
+    for name, path in sorted(built.items()):
+        click.echo(f"✅ {name} -> {path}")
+
+
+@click.command("export")
+@click.argument("kind", type=click.Choice(sorted(KINDS)))
+@click.option("--format", "fmt", type=click.Choice(sorted(FORMATS)), default="csv", show_default=True)
+@click.option("--student", help="Username; only this student's attempts.")
+@click.option("--mode", help="Only attempts in this mode.")
+@click.option("--since", help="Attempts started at or after this ISO date/time.")
+@click.option("--until", help="Attempts started before this ISO date/time.")
+@click.option("--gzip", "gzipped", is_flag=True, help="Compress (implied by an -o name ending in .gz).")
+@click.option("-o", "--output", default="-", help="File to write; '-' for stdout.")
+@with_appcontext
+def export_command(kind, fmt, student, mode, since, until, gzipped, output):
+    """Stream attempts or answer events as CSV or JSONL."""
+    filters = {"mode": mode, "since": _parse_ts(since), "until": _parse_ts(until)}
+    for name, raw in (("since", since), ("until", until)):
+        if raw and filters[name] is None:
+            raise click.BadParameter(f"not an ISO date: {raw}", param_hint=f"--{name}")
+    if student:
+        user = User.query.filter_by(username=student).first()
+        if not user:
+            raise click.BadParameter(f"no such user: {student}", param_hint="--student")
+        filters["user_id"] = user.id
+
+    gzipped = gzipped or output.endswith(".gz")
+    with click.open_file(output, "wb") as out:
+        for chunk in export_stream(kind, fmt, gzip=gzipped, **filters):
+            out.write(chunk)
+
+
+def _hot_queries():
+    """The queries request handlers run per page view or per answer."""
+    return {
+        "attempts of a student, one keyset page": Attempt.for_user(1)
+            .filter(db.tuple_(*ATTEMPT_ORDER) < (datetime(2030, 1, 1), 100))
+            .order_by(*[c.desc() for c in ATTEMPT_ORDER]).limit(51),
+        "questions, one keyset page": Question.query
+            .filter(Question.id < 100).order_by(Question.id.desc()).limit(51),
+        "dashboard per-student totals": UserStats.query
+            .filter(UserStats.user_id.in_([1, 2, 3]), UserStats.mode == UserStats.ALL_MODES),
+        "profile totals": UserStats.query.filter(UserStats.user_id == 1),
+        "attempts in a mode": db.session.query(db.func.count(Attempt.id))
+            .filter(Attempt.mode == "adaptive"),
+        "events of an attempt": AttemptEvent.query
+            .filter(AttemptEvent.attempt_id == 1).order_by(AttemptEvent.id),
+        "question ids near a difficulty": db.session.query(Question.id)
+            .filter(Question.difficulty.in_([2, 3, 4])),
+        "questions by prompt hash": db.session.query(Question.prompt_hash, Question.id)
+            .filter(Question.prompt_hash.in_(["a", "b"])),
+        "user by username": User.query.filter(User.username == "x"),
+        "leaderboard top-K": LeaderboardEntry.board("minuterush", "week")
+            .order_by(LeaderboardEntry.best.desc(), LeaderboardEntry.achieved_at.asc()).limit(50),
+        "leaderboard scores for ranking": LeaderboardEntry.board("minuterush", "week")
+            .with_entities(LeaderboardEntry.best).order_by(LeaderboardEntry.best.desc()),
+    }
+
+
+@click.command("check-query-plans")
+@with_appcontext
+def check_query_plans_command():
+    """Fail if a hot query scans a table or sorts without an index (SQLite)."""
+    if db.engine.dialect.name != "sqlite":
+        raise click.ClickException("check-query-plans reads SQLite's EXPLAIN QUERY PLAN output")
+
+    failures = 0
+    for label, query in _hot_queries().items():
+        sql = str(query.statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plan = [row[-1] for row in db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}"))]
+        bad = [step for step in plan
+               if (step.startswith("SCAN") and "INDEX" not in step) or "TEMP B-TREE" in step]
+        failures += bool(bad)
+        click.echo(f"{'❌' if bad else '✅'} {label}: {' | '.join(plan)}")
+
+    if failures:
+        raise click.ClickException(f"{failures} hot queries are not using an index")
+
+
+def register_commands(app):
+    app.cli.add_command(backfill_events_command)
+    app.cli.add_command(rebuild_question_stats_command)
+    app.cli.add_command(rebuild_user_stats_command)
+    app.cli.add_command(rebuild_leaderboards_command)
+    app.cli.add_command(analyze_items_command)
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(check_query_plans_command)
@@ -2,7 +2,76 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+
+def engine_options(uri, pool_size=10, max_overflow=20, busy_timeout_ms=5000):
+    """SQLALCHEMY_ENGINE_OPTIONS suited to the database behind `uri`."""
+    if uri.startswith("sqlite"):
+        # One writer at a time whatever the pool size; the pool only saves
+        # reconnects. `timeout` is how long pysqlite waits on a locked database.
+        return {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "connect_args": {"timeout": busy_timeout_ms / 1000, "check_same_thread": False},
+        }
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_pre_ping": True,     # drop connections the server closed
+        "pool_recycle": 1800,
+    }
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "devsecret123")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///quizapp.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # PRAGMAs run on every new SQLite connection (see extensions.py)
+    SQLITE_PRAGMAS = {}
+
+    # Minify and fingerprint static assets on start when they changed (see assets.py)
+    ASSETS_BUILD = os.getenv("ASSETS_BUILD", "1") == "1"
+
+    # Write-behind for answer submits (see write_behind.py); off unless WRITE_BEHIND=1
+    WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0") == "1"
+    WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "50"))   # flush at least this often
+    WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "200"))        # or once this many answers wait
+    WRITE_BEHIND_QUEUE = int(os.getenv("WRITE_BEHIND_QUEUE", "5000"))       # queued submits before backpressure
+    WRITE_BEHIND_BLOCK_S = float(os.getenv("WRITE_BEHIND_BLOCK_S", "5"))    # wait for room, then answer 503
+
+    # Request profiling (see perf.py); off unless PERF_ENABLED=1
+    PERF_ENABLED = os.getenv("PERF_ENABLED", "0") == "1"
+    PERF_WINDOW = int(os.getenv("PERF_WINDOW", "1000"))           # samples kept per endpoint
+    PERF_PROFILE_RATE = float(os.getenv("PERF_PROFILE_RATE", "0"))  # fraction of requests to cProfile
+    PERF_PROFILE_DIR = os.getenv("PERF_PROFILE_DIR")              # default: instance/profiles
+
+
+class ProductionConfig(Config):
+    """
+    APP_CONFIG=production. On SQLite, WAL lets the teacher analytics read
+    while students commit answers (readers see a snapshot and take no lock
+    writers wait on), and synchronous=NORMAL is durable in WAL mode except
+    on power loss. busy_timeout makes a second writer wait its turn instead
+    of failing with "database is locked".
+    """
+    BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "15000"))
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,           # KiB, i.e. 32 MB of page cache per connection
+        "temp_store": "MEMORY",
+        "busy_timeout": BUSY_TIMEOUT_MS,
+    }
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        Config.SQLALCHEMY_DATABASE_URI,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        busy_timeout_ms=BUSY_TIMEOUT_MS,
+    )
+
+
+CONFIGS = {"development": Config, "production": ProductionConfig}
+
+
+def get_config(name=None):
+    return CONFIGS.get(name or os.getenv("APP_CONFIG", "development"), Config)
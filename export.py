@@ -0,0 +1,145 @@
+# export.py
+# Streaming export of attempts and answer events as CSV or JSONL, shared by
+# the teacher export route and `flask export`. Rows come from a Core select
+# fetched in BATCH_SIZE pieces (server-side cursor where the driver has one),
+# are formatted into CHUNK_BYTES pieces and can be gzipped on the fly, so
+# memory stays flat however many events are exported.
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from sqlalchemy import select
+
+from extensions import db
+from models import Attempt, AttemptEvent, User
+
+BATCH_SIZE = 1000           # rows per fetch from the database
+CHUNK_BYTES = 64 * 1024     # output is handed on in pieces of about this size
+
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+# Output columns per kind; the selects below label their columns to match
+KINDS = {
+    "attempts": ("attempt_id", "user_id", "username", "mode", "score",
+                 "started_at", "ended_at", "closed_at"),
+    "events": ("event_id", "attempt_id", "user_id", "username", "mode", "qid",
+               "correct", "time_used", "difficulty", "selected", "timestamp"),
+}
+
+
+def _statement(kind):
+    if kind == "attempts":
+        return (select(Attempt.id.label("attempt_id"), Attempt.user_id, User.username,
+                       Attempt.mode, Attempt.score, Attempt.started_at, Attempt.ended_at,
+                       Attempt.closed_at)
+                .join(User, User.id == Attempt.user_id)
+                .order_by(Attempt.id))
+    # Attempts are the outer loop and events come through ix_attempt_event_attempt_id
+    # already in this order, so only a one-student export (which walks
+    # ix_attempt_user_started) sorts anything, and then just that student's events
+    return (select(AttemptEvent.id.label("event_id"), AttemptEvent.attempt_id,
+                   Attempt.user_id, User.username, Attempt.mode, AttemptEvent.qid,
+                   AttemptEvent.correct, AttemptEvent.time_used, AttemptEvent.difficulty,
+                   AttemptEvent.selected, AttemptEvent.timestamp)
+            .join(Attempt, Attempt.id == AttemptEvent.attempt_id)
+            .join(User, User.id == Attempt.user_id)
+            .order_by(Attempt.id, AttemptEvent.id))
+
+
+def export_rows(kind, user_id=None, mode=None, since=None, until=None):
+    """
+    Yield one tuple per row (columns as in KINDS[kind]). Filters select
+    attempts: by student, by mode, and started in [since, until).
+    """
+    stmt = _statement(kind)
+    if user_id is not None:
+        stmt = stmt.where(Attempt.user_id == user_id)
+    if mode:
+        stmt = stmt.where(Attempt.mode == mode)
+    if since:
+        stmt = stmt.where(Attempt.started_at >= since)
+    if until:
+        stmt = stmt.where(Attempt.started_at < until)
+
+    # Plain rows, not ORM objects: nothing accumulates in the session
+    result = db.session.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+
+def _value(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+def _selected(raw):
+    try:
+        return json.loads(raw) if raw else []
+    except ValueError:
+        return []
+
+
+def iter_csv(kind, rows):
+    """CSV text in chunks, header first. `selected` is written as ids joined by ';'."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(KINDS[kind])
+    sel = KINDS[kind].index("selected") if kind == "events" else None
+    for row in rows:
+        row = [_value(v) for v in row]
+        if sel is not None:
+            row[sel] = ";".join(str(x) for x in _selected(row[sel]))
+        writer.writerow(row)
+        if buf.tell() >= CHUNK_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def iter_jsonl(kind, rows):
+    """One JSON object per line, in chunks."""
+    columns = KINDS[kind]
+    lines, size = [], 0
+    for row in rows:
+        record = {c: _value(v) for c, v in zip(columns, row)}
+        if kind == "events":
+            record["selected"] = _selected(record["selected"])
+        line = json.dumps(record) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(lines)
+            lines, size = [], 0
+    yield "".join(lines)
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into one gzip member, as it goes."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def export_stream(kind, fmt="csv", gzip=False, **filters):
+    """Bytes of the whole export, chunk by chunk. Raises ValueError for an unknown kind or format."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown export: {kind}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    formatter = iter_csv if fmt == "csv" else iter_jsonl
+    chunks = (text.encode("utf-8") for text in formatter(kind, export_rows(kind, **filters)) if text)
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def export_filename(kind, fmt, gzip=False, at=None):
+    stamp = (at or datetime.utcnow()).strftime("%Y%m%d-%H%M%S")
+    return f"quizapp-{kind}-{stamp}.{fmt}" + (".gz" if gzip else "")
@@ -0,0 +1,284 @@
+# item_analysis.py
+# Batch item analysis and difficulty calibration. Every answer event is read
+# once into NumPy arrays that form a sparse students x questions response
+# matrix (coordinate form, first answer per student and question). From it:
+#   p-value         share of students answering the question correctly
+#   point-biserial  correlation between the question and the student's score
+#                   on the other questions they answered (discrimination)
+#   distractors     per selection: how many picked it and how well they scored
+#   Rasch (1PL)     difficulty in logits by joint maximum likelihood, with SE
+#                   and infit mean square
+# The Rasch difficulty is mapped onto the 1-10 scale the modes use; see
+# ItemCalibration.apply() for writing it back to Question.difficulty. The
+# adaptive mode reads rasch_b directly (quiz/modes/irt.py).
+#
+# NumPy is optional for the app: importing this module raises ImportError
+# without it, which callers report (like openpyxl for .xlsx uploads).
+
+import json
+import time
+from array import array
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+
+from extensions import db
+from models import Attempt, AttemptEvent, ItemCalibration
+from quiz.modes.irt import LEVEL_CENTER, LEVELS_PER_LOGIT
+
+BATCH_SIZE = 10000          # events per fetch
+MIN_RESPONSES = 30          # below this a question gets statistics but no calibrated level
+BOUND = 6.0                 # logits; abilities and difficulties stay within +-BOUND
+MAX_ITER = 100
+TOLERANCE = 1e-3            # stop once no difficulty moves more than this (logits)
+
+
+class ItemAnalysisReport:
+    def __init__(self):
+        self.events = 0         # answer events read
+        self.responses = 0      # first answers used
+        self.students = 0
+        self.questions = 0
+        self.calibrated = 0     # questions with a calibrated level
+        self.iterations = 0     # Rasch fit iterations
+        self.seconds = 0.0
+
+
+# --- loading ---------------------------------------------------------------
+
+def _selection_label(raw):
+    """'["3", "1"]' -> '1;3'; the same selection always gets the same label."""
+    try:
+        chosen = json.loads(raw) if raw else []
+    except ValueError:
+        chosen = []
+    if not isinstance(chosen, list):
+        chosen = [chosen]
+    return ";".join(sorted(str(c) for c in chosen))
+
+
+def _fetch(sql):
+    """
+    Yield row batches from the driver's own cursor. SQLAlchemy result rows
+    cost more than the query itself at this volume, and every column here
+    is a plain int or string already.
+    """
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _compiled(stmt):
+    return str(stmt.compile(db.engine))
+
+
+def load_responses():
+    """
+    Read all answer events in id order. Returns (user_ids, qids, correct,
+    picks, labels): parallel arrays with one entry per event, where
+    picks[i] indexes the selection label in `labels`.
+    """
+    attempt_ids, attempt_users = array("q"), array("q")
+    for rows in _fetch(_compiled(select(Attempt.id, Attempt.user_id).order_by(Attempt.id))):
+        a, u = zip(*rows)
+        attempt_ids.extend(a)
+        attempt_users.extend(u)
+
+    attempts, qids, correct, picks = array("q"), array("q"), array("b"), array("q")
+    codes, labels, label_codes = {}, [], {}
+    stmt = select(AttemptEvent.attempt_id, AttemptEvent.qid, AttemptEvent.correct,
+                  AttemptEvent.selected).order_by(AttemptEvent.id)
+    for rows in _fetch(_compiled(stmt)):
+        a, q, ok, raw = zip(*rows)
+        attempts.extend(a)
+        qids.extend(q)
+        correct.extend(ok)
+        # Only a handful of distinct selections exist; parse each once
+        for r in set(raw).difference(codes):
+            label = _selection_label(r)
+            if label not in label_codes:
+                label_codes[label] = len(labels)
+                labels.append(label)
+            codes[r] = label_codes[label]
+        picks.extend(map(codes.__getitem__, raw))
+
+    # Attempt -> student, by binary search over the sorted attempt ids
+    attempt_ids = np.frombuffer(attempt_ids, dtype=np.int64)
+    attempts = np.frombuffer(attempts, dtype=np.int64)
+    users = np.frombuffer(attempt_users, dtype=np.int64)[np.searchsorted(attempt_ids, attempts)]
+    return (users, np.frombuffer(qids, dtype=np.int64), np.frombuffer(correct, dtype=np.int8),
+            np.frombuffer(picks, dtype=np.int64), labels)
+
+
+# --- statistics ------------------------------------------------------------
+
+def _expit(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _logit(p):
+    return np.log(p / (1.0 - p))
+
+
+def grouped_corr(g, x, y, n):
+    """Pearson correlation of x and y within each group g in 0..n-1; NaN where undefined."""
+    cnt = np.bincount(g, minlength=n)
+    sx, sy = np.bincount(g, x, n), np.bincount(g, y, n)
+    sxx, syy, sxy = np.bincount(g, x * x, n), np.bincount(g, y * y, n), np.bincount(g, x * y, n)
+    cov = cnt * sxy - sx * sy
+    var = (cnt * sxx - sx * sx) * (cnt * syy - sy * sy)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(var > 0, cov / np.sqrt(var), np.nan)
+
+
+def _newton_step(g, resid, info, n):
+    """Per-group Newton step sum(resid) / sum(info), limited to one logit."""
+    num, den = np.bincount(g, resid, n), np.bincount(g, info, n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        step = np.where(den > 0, num / den, 0.0)
+    return np.clip(step, -1.0, 1.0)
+
+
+def fit_rasch(u, q, x, nu, nq):
+    """
+    Joint maximum likelihood fit of P(correct) = 1 / (1 + exp(b[q] - theta[u])).
+    Students and questions with all answers right (or all wrong) have no
+    finite estimate: they are left out of the fit and the questions pinned
+    at -BOUND (or +BOUND). Difficulties are centred on 0.
+    Returns (b, se, infit, iterations); se and infit are NaN where not fitted.
+    """
+    n_u, c_u = np.bincount(u, minlength=nu), np.bincount(u, x, nu)
+    n_q, c_q = np.bincount(q, minlength=nq), np.bincount(q, x, nq)
+    fit_u = (c_u > 0) & (c_u < n_u)
+    fit_q = (c_q > 0) & (c_q < n_q)
+    keep = fit_u[u] & fit_q[q]
+    fu, fq, fx = u[keep], q[keep], x[keep]
+
+    # Start from the log-odds of the raw scores
+    theta, b = np.zeros(nu), np.zeros(nq)
+    theta[fit_u] = _logit(c_u[fit_u] / n_u[fit_u])
+    b[fit_q] = -_logit(c_q[fit_q] / n_q[fit_q])
+
+    iterations = 0
+    for iterations in range(1, MAX_ITER + 1):
+        p = _expit(theta[fu] - b[fq])
+        theta = np.clip(theta + _newton_step(fu, fx - p, p * (1 - p), nu), -BOUND, BOUND)
+        p = _expit(theta[fu] - b[fq])
+        step = _newton_step(fq, fx - p, p * (1 - p), nq)
+        b = np.clip(b - step, -BOUND, BOUND)
+        if fit_q.any():
+            b[fit_q] -= b[fit_q].mean()
+        if not len(step) or np.abs(step).max() < TOLERANCE:
+            break
+
+    p = _expit(theta[fu] - b[fq])
+    info = np.bincount(fq, p * (1 - p), nq)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        se = np.where(info > 0, 1.0 / np.sqrt(info), np.nan)
+        infit = np.where(info > 0, np.bincount(fq, (fx - p) ** 2, nq) / info, np.nan)
+
+    b[~fit_q & (c_q == 0)] = BOUND
+    b[~fit_q & (c_q == n_q)] = -BOUND
+    return b, se, infit, iterations
+
+
+def to_level(b):
+    """Rasch difficulty (logits) on the 1-10 difficulty scale."""
+    return np.clip(np.rint(LEVEL_CENTER + b * LEVELS_PER_LOGIT), 1, 10).astype(np.int64)
+
+
+def _num(v, digits=4):
+    v = float(v)
+    return None if np.isnan(v) else round(v, digits)
+
+
+# --- job -------------------------------------------------------------------
+
+def analyze_items(min_responses=MIN_RESPONSES):
+    """
+    Recompute item statistics for every answered question and replace the
+    ItemCalibration rows. Returns an ItemAnalysisReport; the caller commits.
+    """
+    started = time.perf_counter()
+    report = ItemAnalysisReport()
+    users, qids, correct, picks, labels = load_responses()
+    report.events = len(users)
+
+    ItemCalibration.query.delete(synchronize_session=False)
+    if not report.events:
+        report.seconds = time.perf_counter() - started
+        return report
+
+    # Dense row (student) and column (question) indices
+    user_ids, u = np.unique(users, return_inverse=True)
+    question_ids, q = np.unique(qids, return_inverse=True)
+    nu, nq = len(user_ids), len(question_ids)
+
+    # One response per cell: the student's first answer to the question,
+    # before any practice effect (np.unique returns first occurrences)
+    _, first = np.unique(u * nq + q, return_index=True)
+    u, q, picks = u[first], q[first], picks[first]
+    x = correct[first].astype(np.float64)
+    report.responses, report.students, report.questions = len(x), nu, nq
+
+    n_q = np.bincount(q, minlength=nq)
+    p_value = np.bincount(q, x, nq) / n_q
+
+    # Rest score: share correct on the student's other questions
+    n_u, c_u = np.bincount(u, minlength=nu), np.bincount(u, x, nu)
+    others = n_u[u] - 1
+    has_rest = others > 0
+    rest = np.where(has_rest, (c_u[u] - x) / np.maximum(others, 1), 0.0)
+    pbis = grouped_corr(q[has_rest], x[has_rest], rest[has_rest], nq)
+
+    b, se, infit, report.iterations = fit_rasch(u, q, x, nu, nq)
+    levels = to_level(b)
+
+    # Distractors: one cell per (question, selection)
+    nl = max(1, len(labels))
+    cells, inv = np.unique(q * nl + picks, return_inverse=True)
+    picked = np.bincount(inv)
+    right = np.bincount(inv, x) / picked
+    score_n = np.bincount(inv[has_rest], minlength=len(cells))
+    score_sum = np.bincount(inv[has_rest], rest[has_rest], len(cells))
+    distractors = [[] for _ in range(nq)]
+    for cell, count, ok, sn, ss in zip(cells.tolist(), picked.tolist(), right.tolist(),
+                                       score_n.tolist(), score_sum.tolist()):
+        qi, label = divmod(cell, nl)
+        distractors[qi].append({
+            "option": labels[label] if labels else "",
+            "count": count,
+            "share": round(count / n_q[qi], 4),
+            "mean_score": round(ss / sn, 4) if sn else None,
+            "correct": ok > 0.5,
+        })
+
+    now = datetime.utcnow()
+    rows = []
+    for i, qid in enumerate(question_ids.tolist()):
+        enough = n_q[i] >= min_responses
+        report.calibrated += bool(enough)
+        rows.append({
+            "qid": qid,
+            "responses": int(n_q[i]),
+            "p_value": _num(p_value[i]),
+            "point_biserial": _num(pbis[i]),
+            "rasch_b": _num(b[i]),
+            "rasch_se": _num(se[i]),
+            "infit": _num(infit[i]),
+            "calibrated": int(levels[i]) if enough else None,
+            "distractors": json.dumps(sorted(distractors[i], key=lambda d: -d["count"])),
+            "computed_at": now,
+        })
+    db.session.bulk_insert_mappings(ItemCalibration, rows)
+
+    report.seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,224 @@
+# migrations.py
+# Versioned schema migrations.
+#
+# create_app() calls upgrade_schema(). A brand-new database is created from
+# the models by db.create_all() and stamped with the latest version. An
+# existing database first gets any missing tables from create_all(), then
+# every migration newer than the version stored in `schema_version` runs in
+# order. Migrations check what is already there, because databases created
+# by older releases may have part of a change through create_all().
+#
+# To change an existing table: update the model, then add a function here
+# with the next version number.
+
+import re
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import AddConstraint, CreateTable, DropConstraint, MetaData, Table
+
+from extensions import db
+from models import Attempt, AttemptEvent, AttemptState, PendingServes, Question, SeenSet, prompt_hash
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def latest_version():
+    return max(v for v, _, _ in MIGRATIONS)
+
+
+# --- helpers -----------------------------------------------------------------
+
+def _columns(conn, table):
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _indexes(conn, table):
+    return {i["name"] for i in inspect(conn).get_indexes(table)}
+
+
+def _cascading_fks(conn, table):
+    """Referencing columns of FKs on `table` that already have ON DELETE CASCADE."""
+    return {
+        col
+        for fk in inspect(conn).get_foreign_keys(table)
+        if (fk.get("options") or {}).get("ondelete", "").upper() == "CASCADE"
+        for col in fk["constrained_columns"]
+    }
+
+
+def _rebuild_sqlite_table(conn, table):
+    """
+    SQLite can't add or change constraints in place: create the table again
+    from the model under a temporary name, copy the rows, and swap it in.
+    Needs PRAGMA foreign_keys=OFF on `conn`.
+    """
+    name = conn.dialect.identifier_preparer.format_table(table)
+    tmp = f"_new_{table.name}"
+    ddl = str(CreateTable(table).compile(conn))
+    conn.exec_driver_sql(re.sub(rf"CREATE TABLE {re.escape(name)}", f"CREATE TABLE {tmp}", ddl, count=1))
+
+    cols = ", ".join(conn.dialect.identifier_preparer.quote(c)
+                     for c in table.columns.keys() if c in _columns(conn, table.name))
+    conn.exec_driver_sql(f"INSERT INTO {tmp} ({cols}) SELECT {cols} FROM {name}")
+    conn.exec_driver_sql(f"DROP TABLE {name}")
+    conn.exec_driver_sql(f"ALTER TABLE {tmp} RENAME TO {name}")
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+# --- migrations --------------------------------------------------------------
+
+@migration(1, "question.prompt_hash column, index and backfill")
+def _prompt_hash(conn):
+    if "prompt_hash" not in _columns(conn, "question"):
+        conn.exec_driver_sql("ALTER TABLE question ADD COLUMN prompt_hash VARCHAR(64)")
+    if "ix_question_prompt_hash" not in _indexes(conn, "question"):
+        conn.exec_driver_sql("CREATE INDEX ix_question_prompt_hash ON question (prompt_hash)")
+
+    q = Question.__table__
+    while True:
+        rows = conn.execute(db.select(q.c.id, q.c.prompt)
+                            .where(q.c.prompt_hash.is_(None)).limit(1000)).all()
+        if not rows:
+            break
+        for qid, prompt in rows:
+            conn.execute(q.update().where(q.c.id == qid).values(prompt_hash=prompt_hash(prompt)))
+
+
+@migration(2, "indexes for per-student attempt lists, mode filters and difficulty picks")
+def _hot_path_indexes(conn):
+    # (user_id, started_at) covers every lookup the single-column index served
+    if "ix_attempt_user_id" in _indexes(conn, "attempt"):
+        conn.exec_driver_sql("DROP INDEX ix_attempt_user_id")
+    for table in (Attempt.__table__, Question.__table__):
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+@migration(3, "foreign keys with ON DELETE CASCADE from attempts to users and from events/state to attempts")
+def _cascading_foreign_keys(conn):
+    # Rows left behind by deletes from before the constraints existed
+    conn.exec_driver_sql('DELETE FROM attempt WHERE user_id NOT IN (SELECT id FROM "user")')
+    for child in ("attempt_event", "attempt_state"):
+        conn.exec_driver_sql(f"DELETE FROM {child} WHERE attempt_id NOT IN (SELECT id FROM attempt)")
+
+    for model, column in ((Attempt, "user_id"), (AttemptEvent, "attempt_id"),
+                          (AttemptState, "attempt_id")):
+        table = model.__table__
+        if column in _cascading_fks(conn, table.name):
+            continue
+        if conn.dialect.name == "sqlite":
+            _rebuild_sqlite_table(conn, table)
+            continue
+        reflected = Table(table.name, MetaData(), autoload_with=conn)
+        for fk in reflected.foreign_key_constraints:
+            if column in fk.column_keys and fk.name:
+                conn.execute(DropConstraint(fk))
+        for fk in table.foreign_key_constraints:
+            if column in fk.column_keys:
+                conn.execute(AddConstraint(fk))
+
+    if conn.dialect.name == "sqlite":
+        broken = conn.exec_driver_sql("PRAGMA foreign_key_check").fetchall()
+        if broken:
+            raise RuntimeError(f"Foreign key violations after migration: {broken[:5]}")
+
+
+@migration(4, "attempt.closed_at for counting attempts in user_stats")
+def _attempt_closed_at(conn):
+    if "closed_at" not in _columns(conn, "attempt"):
+        conn.exec_driver_sql("ALTER TABLE attempt ADD COLUMN closed_at DATETIME")
+    # user_stats itself comes from create_all(); fill it with `flask rebuild-user-stats`
+
+
+@migration(5, "attempt.summary for frozen results snapshots")
+def _attempt_summary(conn):
+    if "summary" not in _columns(conn, "attempt"):
+        conn.exec_driver_sql("ALTER TABLE attempt ADD COLUMN summary TEXT")
+
+
+@migration(6, "attempt_state.ability and ability_se for the IRT adaptive mode")
+def _attempt_state_ability(conn):
+    columns = _columns(conn, "attempt_state")
+    for name in ("ability", "ability_se"):
+        if name not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE attempt_state ADD COLUMN {name} FLOAT")
+
+
+@migration(7, "attempt_state.order_bits for seeded question orders")
+def _attempt_state_order(conn):
+    if "order_bits" not in _columns(conn, "attempt_state"):
+        conn.exec_driver_sql("ALTER TABLE attempt_state ADD COLUMN order_bits BLOB")
+
+
+@migration(8, "attempt_state.pending_ids so each serve is answered at most once")
+def _attempt_state_pending(conn):
+    if "pending_ids" not in _columns(conn, "attempt_state"):
+        conn.exec_driver_sql("ALTER TABLE attempt_state ADD COLUMN pending_ids BLOB")
+
+    # Open attempts: whatever was served and not answered yet is still pending
+    s, a, e = AttemptState.__table__, Attempt.__table__, AttemptEvent.__table__
+    rows = conn.execute(db.select(s.c.attempt_id, s.c.seen_bits)
+                        .join(a, a.c.id == s.c.attempt_id)
+                        .where(a.c.closed_at.is_(None), s.c.seen_bits.isnot(None))).all()
+    for attempt_id, seen_bits in rows:
+        answered = set(conn.execute(db.select(e.c.qid).where(e.c.attempt_id == attempt_id))
+                       .scalars())
+        pending = PendingServes()
+        pending.ids.extend(qid for qid in SeenSet(seen_bits) if qid not in answered)
+        conn.execute(s.update().where(s.c.attempt_id == attempt_id)
+                     .values(pending_ids=pending.to_bytes()))
+
+
+# --- runner ------------------------------------------------------------------
+
+def _current_version(conn):
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    row = conn.exec_driver_sql("SELECT version FROM schema_version").first()
+    return row[0] if row else None
+
+
+def _stamp(conn, version):
+    conn.exec_driver_sql("DELETE FROM schema_version")
+    conn.exec_driver_sql(f"INSERT INTO schema_version (version) VALUES ({int(version)})")
+
+
+def upgrade_schema(log=print):
+    """Bring the database up to the latest version. Returns that version."""
+    fresh = not inspect(db.engine).has_table("user")
+    db.create_all()
+
+    with db.engine.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            # Table rebuilds must not trip (or cascade through) foreign keys
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        try:
+            current = _current_version(conn)
+            if fresh:
+                _stamp(conn, latest_version())
+                conn.commit()
+                return latest_version()
+
+            current = current or 0
+            for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+                if version <= current:
+                    continue
+                log(f"Migrating schema to v{version}: {description}")
+                fn(conn)
+                _stamp(conn, version)
+                conn.commit()
+                current = version
+            conn.commit()
+            return current
+        finally:
+            if sqlite:
+                conn.rollback()  # the pragma is ignored inside a transaction
+                conn.exec_driver_sql("PRAGMA foreign_keys=ON")
@@ -2,9 +2,14 @@
 from extensions import db, login_manager
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from sqlalchemy.orm import validates
+from datetime import datetime, timedelta
 import enum
+import hashlib
 import json
+import random
+import struct
+from array import array
 
 class Role(enum.Enum):
     STUDENT = "student"
@@ -22,34 +27,591 @@ class User(UserMixin, db.Model):
     def check_password(self, pw):
         return check_password_hash(self.password_hash, pw)
 
+def prompt_hash(prompt):
+    """Stable lookup key for a question prompt (Text columns are not indexable)."""
+    return hashlib.sha256(str(prompt or "").strip().encode("utf-8")).hexdigest()
+
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     prompt = db.Column(db.Text, nullable=False)
+    prompt_hash = db.Column(db.String(64), index=True)
     options_json = db.Column(db.Text, nullable=False)
     correct_answers = db.Column(db.String(200), nullable=False)
     difficulty = db.Column(db.Integer, default=3)
     qtype = db.Column(db.String(50), default="single")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_question_difficulty_id", "difficulty", "id"),
+    )
+
+    @validates("prompt")
+    def _hash_prompt(self, key, value):
+        self.prompt_hash = prompt_hash(value)
+        return value
+
+    def to_dict(self):
+        try:
+            options = json.loads(self.options_json or "[]")
+        except Exception:
+            options = []
+        return {
+            "id": self.id,
+            "prompt": self.prompt,
+            "options": options,
+            "correct_answers": self.correct_answers,
+            "difficulty": self.difficulty,
+            "qtype": self.qtype,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+class BankRevision(db.Model):
+    """Single-row counter bumped whenever the question bank changes.
+
+    Worker processes compare it against the revision their in-memory
+    question index was built from (see quiz/modes/common.py).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+
 class Attempt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, nullable=False)
-    mode = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    mode = db.Column(db.String(50), nullable=False, index=True)
     score = db.Column(db.Integer, default=0)
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     ended_at = db.Column(db.DateTime)
-    details = db.Column(db.Text)  # JSON encoded list of per-question events
-
-    def add_event(self, event: dict):
-        # event example: {"qid":1,"correct":True,"time_used":7,"selected":["1"],"difficulty":3}
-        dd = []
-        if self.details:
-            try:
-                dd = json.loads(self.details)
-            except Exception:
-                dd = []
-        dd.append(event)
-        self.details = json.dumps(dd, ensure_ascii=False)
+    closed_at = db.Column(db.DateTime)  # set once, when the attempt is counted in UserStats
+    details = db.Column(db.Text)  # JSON start record; answers live in AttemptEvent
+    # JSON results snapshot, stored on first view once closed (loaded only by the results page)
+    summary = db.deferred(db.Column(db.Text))
+
+    __table_args__ = (
+        db.Index("ix_attempt_user_started", "user_id", "started_at"),
+    )
+
+    # Rows go with the attempt through ON DELETE CASCADE
+    events = db.relationship("AttemptEvent", lazy="dynamic", order_by="AttemptEvent.id",
+                             cascade="all, delete-orphan", passive_deletes=True)
+    state = db.relationship("AttemptState", uselist=False, cascade="all, delete-orphan",
+                            passive_deletes=True)
+
+    @classmethod
+    def for_user(cls, user_id, mode=None):
+        """Query for a user's attempts, optionally in one mode."""
+        q = cls.query.filter(cls.user_id == user_id)
+        if mode:
+            q = q.filter(cls.mode == mode)
+        return q
+
+    def get_state(self):
+        """Server-side progress for this attempt, created on first use."""
+        if self.state is None:
+            self.state = AttemptState(attempt_id=self.id, current_diff=3)
+        return self.state
+
+    def add_event(self, qid, correct, time_used=None, difficulty=None, selected=None,
+                  timestamp=None, defer=False):
+        """
+        Append one answered question. Single-row insert; caller commits.
+        With `defer` the event is only kept on this instance (see
+        deferred_events()) for the write-behind queue to insert later.
+        """
+        try:
+            t = float(time_used) if time_used is not None else None
+        except (TypeError, ValueError):
+            t = None
+        ev = AttemptEvent(
+            attempt_id=self.id,
+            qid=qid,
+            correct=bool(correct),
+            time_used=t,
+            difficulty=difficulty,
+            selected=json.dumps(list(selected or []), ensure_ascii=False),
+            timestamp=timestamp or datetime.utcnow(),
+        )
+        if defer:
+            self.deferred_events().append(ev)
+            return ev
+        db.session.add(ev)
+        QuestionStats.record(qid, ev.correct, t, ev.timestamp)
+        return ev
+
+    def deferred_events(self):
+        """Events added with defer=True during this request, oldest first."""
+        if "_deferred_events" not in self.__dict__:
+            self._deferred_events = []
+        return self._deferred_events
+
+    def last_event(self):
+        deferred = self.__dict__.get("_deferred_events")
+        if deferred:
+            return deferred[-1]
+        return self.events.order_by(None).order_by(AttemptEvent.id.desc()).first()
+
+    def close(self, at=None):
+        """
+        Finish the attempt and count it in UserStats. Only the first call
+        (from any process) counts it; returns whether this one did. Caller commits.
+        """
+        at = at or datetime.utcnow()
+        won = (Attempt.query
+               .filter(Attempt.id == self.id, Attempt.closed_at.is_(None))
+               .update({Attempt.closed_at: at}))
+        self.ended_at = at
+        if won:
+            UserStats.record(self, at)
+            LeaderboardEntry.record(self, at)
+        return bool(won)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "mode": self.mode,
+            "score": self.score,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "ended_at": self.ended_at.isoformat() if self.ended_at else None,
+            "closed": self.closed_at is not None,
+        }
+
+# Keyset order for attempt lists; with a user_id filter it walks
+# ix_attempt_user_started (which ends in the row id) without sorting
+ATTEMPT_ORDER = (Attempt.started_at, Attempt.id)
+
+class SeenSet:
+    """
+    Compact set of question ids: one bit per id, so membership is O(1) and
+    storage is max_id / 8 bytes regardless of how many have been answered.
+    """
+    __slots__ = ("bits",)
+
+    def __init__(self, raw=None):
+        self.bits = bytearray(raw or b"")
+
+    def __contains__(self, qid):
+        try:
+            byte, bit = divmod(int(qid), 8)
+        except (TypeError, ValueError):
+            return False
+        return 0 <= byte < len(self.bits) and bool(self.bits[byte] & (1 << bit))
+
+    def add(self, qid):
+        byte, bit = divmod(int(qid), 8)
+        if byte >= len(self.bits):
+            self.bits.extend(b"\0" * (byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << bit
+
+    def __len__(self):
+        return bin(int.from_bytes(self.bits, "little")).count("1")
+
+    def __bool__(self):
+        return any(self.bits)
+
+    def __iter__(self):
+        for byte, val in enumerate(self.bits):
+            if val:
+                for bit in range(8):
+                    if val & (1 << bit):
+                        yield byte * 8 + bit
+
+class PendingServes:
+    """
+    Ids of the questions served and not answered yet, one entry per serve,
+    so a question served twice (Level Infinity repeats) can be answered
+    twice. Only the latest MAX serves are kept; older ones can no longer
+    be answered.
+    """
+    __slots__ = ("ids",)
+    MAX = 64
+
+    def __init__(self, raw=None):
+        self.ids = array("q")
+        if raw:
+            self.ids.frombytes(raw)
+
+    def __contains__(self, qid):
+        return qid in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, qid):
+        self.ids.append(int(qid))
+        if len(self.ids) > self.MAX:
+            del self.ids[:len(self.ids) - self.MAX]
+
+    def take(self, qid):
+        """Remove one serve of qid; False if there is none to answer."""
+        try:
+            self.ids.remove(qid)
+        except ValueError:
+            return False
+        return True
+
+    def to_bytes(self):
+        return self.ids.tobytes()
+
+_M64 = (1 << 64) - 1
+
+def _mix64(x):
+    """splitmix64 finalizer: a cheap, well-spread 64-bit hash."""
+    x = (x + 0x9E3779B97F4A7C15) & _M64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _M64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _M64
+    return x ^ (x >> 31)
+
+class QuestionOrder:
+    """
+    Seeded permutation of the question ids 1..span (span: the highest id
+    when the order was made), walked with a cursor. Position -> id goes
+    through a small Feistel network over the id bits plus cycle walking,
+    so the whole order is four packed ints and every step is O(1). The
+    same seed and span always give the same sequence, for auditing.
+    """
+    __slots__ = ("seed", "span", "cursor", "passes")
+    FORMAT = "<QIII"
+    ROUNDS = 4
+
+    def __init__(self, seed, span, cursor=0, passes=0):
+        self.seed, self.span, self.cursor, self.passes = seed, span, cursor, passes
+
+    @classmethod
+    def start(cls, span, seed=None):
+        return cls(random.getrandbits(63) if seed is None else seed, span)
+
+    @classmethod
+    def from_bytes(cls, raw):
+        return cls(*struct.unpack(cls.FORMAT, raw))
+
+    def to_bytes(self):
+        return struct.pack(self.FORMAT, self.seed, self.span, self.cursor, self.passes)
+
+    def at(self, position):
+        """The id at `position` (0 <= position < span)."""
+        bits = max(2, (self.span - 1).bit_length())
+        half = (bits + 1) // 2
+        mask = (1 << half) - 1
+        x = position
+        while True:
+            left, right = x >> half, x & mask
+            for k in range(self.ROUNDS):
+                left, right = right, left ^ (_mix64(self.seed ^ (k << 56) ^ right) & mask)
+            x = (left << half) | right
+            if x < self.span:   # outside the range: keep walking the cycle
+                return x + 1
+
+    def next_id(self):
+        """Advance the cursor; None once every position has been served."""
+        if self.cursor >= self.span:
+            return None
+        self.cursor += 1
+        return self.at(self.cursor - 1)
+
+    def reshuffled(self, span):
+        """The next pass: a new order derived from this one's seed."""
+        return QuestionOrder(_mix64(self.seed) >> 1, span, 0, self.passes + 1)
+
+class AttemptState(db.Model):
+    """Per-attempt selection state owned by the server (not echoed by clients)."""
+    attempt_id = db.Column(db.Integer, db.ForeignKey("attempt.id", ondelete="CASCADE"),
+                           primary_key=True)
+    current_diff = db.Column(db.Integer, nullable=False, default=3)
+    seen_bits = db.Column(db.LargeBinary)  # SeenSet bitmap keyed by question id
+    pending_ids = db.Column(db.LargeBinary)  # PendingServes: served, not answered yet
+    # Adaptive mode's running ability estimate, logits (quiz/modes/irt.py)
+    ability = db.Column(db.Float)
+    ability_se = db.Column(db.Float)
+    order_bits = db.Column(db.LargeBinary)  # packed QuestionOrder, for the shuffled modes
+
+    @property
+    def seen(self):
+        return SeenSet(self.seen_bits)
+
+    @property
+    def order(self):
+        return QuestionOrder.from_bytes(self.order_bits) if self.order_bits else None
+
+    def save_order(self, order):
+        self.order_bits = order.to_bytes()
+
+    @property
+    def pending(self):
+        return PendingServes(self.pending_ids)
+
+    def mark_seen(self, qid):
+        """Record a serve: the question can now be answered once more."""
+        seen = self.seen
+        seen.add(qid)
+        self.seen_bits = bytes(seen.bits)
+        pending = self.pending
+        pending.add(qid)
+        self.pending_ids = pending.to_bytes()
+
+    def take_pending(self, qid):
+        """Use up one serve of qid for an answer; False if none is left."""
+        pending = self.pending
+        if not pending.take(qid):
+            return False
+        self.pending_ids = pending.to_bytes()
+        return True
+
+    def to_dict(self):
+        state = {"current_diff": self.current_diff, "seen_count": len(self.seen)}
+        if self.ability is not None:
+            state["ability"], state["ability_se"] = self.ability, self.ability_se
+        return state
+
+class AttemptEvent(db.Model):
+    """One answered question within an attempt. Rows are append-only."""
+    id = db.Column(db.Integer, primary_key=True)
+    attempt_id = db.Column(db.Integer, db.ForeignKey("attempt.id", ondelete="CASCADE"),
+                           nullable=False, index=True)
+    qid = db.Column(db.Integer, nullable=False, index=True)
+    correct = db.Column(db.Boolean, nullable=False, default=False)
+    time_used = db.Column(db.Float)
+    difficulty = db.Column(db.Integer)
+    selected = db.Column(db.Text)  # JSON encoded list of selected option ids
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        try:
+            selected = json.loads(self.selected) if self.selected else []
+        except Exception:
+            selected = []
+        return {
+            "qid": self.qid,
+            "selected": selected,
+            "correct": self.correct,
+            "time_used": self.time_used,
+            "difficulty": self.difficulty,
+            "timestamp": self.timestamp.isoformat() if self.timestamp else None,
+        }
+
+class QuestionStats(db.Model):
+    """Running per-question answer totals, kept in step with AttemptEvent."""
+    qid = db.Column(db.Integer, primary_key=True)
+    seen = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    time_sum = db.Column(db.Float, nullable=False, default=0.0)
+    last_seen = db.Column(db.DateTime)
+
+    @classmethod
+    def record(cls, qid, correct, time_used=None, seen_at=None):
+        """Count one answer in the current transaction; caller commits."""
+        seen_at = seen_at or datetime.utcnow()
+        delta = {
+            cls.seen: cls.seen + 1,
+            cls.correct: cls.correct + (1 if correct else 0),
+            cls.time_sum: cls.time_sum + (time_used or 0.0),
+            cls.last_seen: seen_at,
+        }
+        if not cls.query.filter_by(qid=qid).update(delta, synchronize_session=False):
+            db.session.add(cls(qid=qid, seen=1, correct=1 if correct else 0,
+                               time_sum=time_used or 0.0, last_seen=seen_at))
+
+    @classmethod
+    def forget(cls, events_query):
+        """Subtract the answers matched by `events_query` (before deleting them)."""
+        rows = events_query.with_entities(
+            AttemptEvent.qid,
+            db.func.count(AttemptEvent.id),
+            db.func.sum(db.cast(AttemptEvent.correct, db.Integer)),
+            db.func.sum(db.func.coalesce(AttemptEvent.time_used, 0.0)),
+        ).group_by(AttemptEvent.qid).all()
+        for qid, seen, correct, time_sum in rows:
+            cls.query.filter_by(qid=qid).update({
+                cls.seen: cls.seen - seen,
+                cls.correct: cls.correct - (correct or 0),
+                cls.time_sum: cls.time_sum - (time_sum or 0.0),
+            }, synchronize_session=False)
+
+class ItemCalibration(db.Model):
+    """
+    Result of the last item-analysis run (item_analysis.py), one row per
+    question answered by anyone. Replaced wholesale on every run.
+    """
+    qid = db.Column(db.Integer, primary_key=True)
+    responses = db.Column(db.Integer, nullable=False, default=0)  # students, first answer each
+    p_value = db.Column(db.Float)           # share answering correctly
+    point_biserial = db.Column(db.Float)    # discrimination against the rest score
+    rasch_b = db.Column(db.Float)           # Rasch difficulty, logits (mean 0)
+    rasch_se = db.Column(db.Float)
+    infit = db.Column(db.Float)             # information-weighted mean square; ~1 fits
+    calibrated = db.Column(db.Integer)      # rasch_b on the 1-10 scale; None below min responses
+    distractors = db.Column(db.Text)        # JSON [{"option", "count", "share", "mean_score", "correct"}]
+    computed_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "qid": self.qid,
+            "responses": self.responses,
+            "p_value": self.p_value,
+            "point_biserial": self.point_biserial,
+            "rasch_b": self.rasch_b,
+            "rasch_se": self.rasch_se,
+            "infit": self.infit,
+            "calibrated": self.calibrated,
+            "distractors": json.loads(self.distractors) if self.distractors else [],
+            "computed_at": self.computed_at.isoformat() if self.computed_at else None,
+        }
+
+    @classmethod
+    def apply(cls):
+        """
+        Copy calibrated levels onto Question.difficulty where they differ.
+        Returns the number of questions changed; the caller bumps the bank
+        revision and commits.
+        """
+        rows = (db.session.query(Question.id, cls.calibrated)
+                .join(cls, cls.qid == Question.id)
+                .filter(cls.calibrated.isnot(None),
+                        db.or_(Question.difficulty.is_(None), Question.difficulty != cls.calibrated))
+                .all())
+        db.session.bulk_update_mappings(Question, [{"id": qid, "difficulty": level}
+                                                   for qid, level in rows])
+        return len(rows)
+
+class UserStats(db.Model):
+    """
+    Per-student totals over closed attempts: one row per mode, plus an
+    overall row under mode ALL_MODES. Kept in step by Attempt.close().
+    """
+    ALL_MODES = ""
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    mode = db.Column(db.String(50), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    best = db.Column(db.Integer, nullable=False, default=0)
+    last_at = db.Column(db.DateTime)
+
+    @property
+    def avg(self):
+        return self.score_sum / self.attempts if self.attempts else 0
+
+    @classmethod
+    def record(cls, attempt, at):
+        """Count one closed attempt in the current transaction; caller commits."""
+        score = attempt.score or 0
+        for mode in (cls.ALL_MODES, attempt.mode):
+            delta = {
+                cls.attempts: cls.attempts + 1,
+                cls.score_sum: cls.score_sum + score,
+                cls.best: db.case((cls.best < score, score), else_=cls.best),
+                cls.last_at: db.case((cls.last_at < at, at), else_=db.func.coalesce(cls.last_at, at)),
+            }
+            if not cls.query.filter_by(user_id=attempt.user_id, mode=mode).update(
+                    delta, synchronize_session=False):
+                db.session.add(cls(user_id=attempt.user_id, mode=mode, attempts=1,
+                                   score_sum=score, best=score, last_at=at))
+
+    @classmethod
+    def for_user(cls, user_id):
+        """{mode: UserStats} for one student; the overall row is under ALL_MODES."""
+        return {s.mode: s for s in cls.query.filter_by(user_id=user_id)}
+
+    @classmethod
+    def rebuild(cls, user_ids=None):
+        """Recompute rows from closed attempts, for everyone or the given users."""
+        doomed = cls.query
+        closed = Attempt.query.filter(Attempt.closed_at.isnot(None))
+        if user_ids is not None:
+            doomed = doomed.filter(cls.user_id.in_(user_ids))
+            closed = closed.filter(Attempt.user_id.in_(user_ids))
+        doomed.delete(synchronize_session=False)
+
+        score = db.func.coalesce(Attempt.score, 0)
+        columns = ["user_id", "mode", "attempts", "score_sum", "best", "last_at"]
+        for mode, group in ((Attempt.mode, (Attempt.user_id, Attempt.mode)),
+                            (db.literal(cls.ALL_MODES), (Attempt.user_id,))):
+            select = closed.with_entities(
+                Attempt.user_id, mode, db.func.count(Attempt.id), db.func.sum(score),
+                db.func.max(score), db.func.max(Attempt.closed_at),
+            ).group_by(*group)
+            db.session.execute(db.insert(cls).from_select(columns, select))
+
+class LeaderboardEntry(db.Model):
+    """
+    A student's best closed-attempt score on one board: a mode over all
+    time, one ISO week or one day (UTC). Kept in step by Attempt.close();
+    ix_leaderboard_rank (below the class) serves top-K as an index range read.
+    """
+    PERIODS = ("all", "week", "day")
+
+    mode = db.Column(db.String(50), primary_key=True)
+    period = db.Column(db.String(8), primary_key=True)
+    period_key = db.Column(db.String(10), primary_key=True)  # "" / Monday / day, as ISO dates
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"),
+                        primary_key=True, index=True)
+    best = db.Column(db.Integer, nullable=False, default=0)
+    achieved_at = db.Column(db.DateTime)
+
+    @classmethod
+    def period_key_for(cls, period, at):
+        if period == "day":
+            return at.date().isoformat()
+        if period == "week":
+            return (at.date() - timedelta(days=at.weekday())).isoformat()
+        return ""
+
+    @classmethod
+    def board(cls, mode, period, at=None):
+        """Filter for one board; `at` picks the week/day (default: now)."""
+        key = cls.period_key_for(period, at or datetime.utcnow())
+        return cls.query.filter(cls.mode == mode, cls.period == period, cls.period_key == key)
+
+    @classmethod
+    def record(cls, attempt, at):
+        """Enter one closed attempt on its mode's boards; caller commits."""
+        score = attempt.score or 0
+        for period in cls.PERIODS:
+            key = cls.period_key_for(period, at)
+            better = cls.best < score
+            if not cls.query.filter_by(mode=attempt.mode, period=period, period_key=key,
+                                       user_id=attempt.user_id).update({
+                        cls.best: db.case((better, score), else_=cls.best),
+                        cls.achieved_at: db.case((better, at), else_=cls.achieved_at),
+                    }, synchronize_session=False):
+                db.session.add(cls(mode=attempt.mode, period=period, period_key=key,
+                                   user_id=attempt.user_id, best=score, achieved_at=at))
+
+    @classmethod
+    def rebuild(cls, user_ids=None, batch_size=1000):
+        """Recompute boards from closed attempts, for everyone or the given users."""
+        doomed = cls.query
+        closed = Attempt.query.filter(Attempt.closed_at.isnot(None))
+        if user_ids is not None:
+            doomed = doomed.filter(cls.user_id.in_(user_ids))
+            closed = closed.filter(Attempt.user_id.in_(user_ids))
+        doomed.delete(synchronize_session=False)
+
+        # Week/day keys are calendar arithmetic, so the grouping happens here
+        best = {}
+        rows = closed.with_entities(Attempt.user_id, Attempt.mode, Attempt.score,
+                                    Attempt.closed_at).order_by(Attempt.closed_at)
+        for user_id, mode, score, at in rows.yield_per(batch_size):
+            score = score or 0
+            for period in cls.PERIODS:
+                k = (mode, period, cls.period_key_for(period, at), user_id)
+                if k not in best or best[k][0] < score:
+                    best[k] = (score, at)
+        db.session.bulk_insert_mappings(cls, [
+            {"mode": m, "period": p, "period_key": key, "user_id": u, "best": b, "achieved_at": at}
+            for (m, p, key, u), (b, at) in best.items()
+        ])
+
+    @classmethod
+    def prune(cls, before):
+        """Drop the week/day boards of weeks/days before the one `before` falls in."""
+        return sum(cls.query.filter(cls.period == period,
+                                    cls.period_key < cls.period_key_for(period, before))
+                   .delete(synchronize_session=False)
+                   for period in ("day", "week"))
+
+# Board order: best score first, earlier achiever first on ties
+db.Index("ix_leaderboard_rank", LeaderboardEntry.mode, LeaderboardEntry.period,
+         LeaderboardEntry.period_key, LeaderboardEntry.best.desc(), LeaderboardEntry.achieved_at)
 
 # flask-login user_loader
 @login_manager.user_loader
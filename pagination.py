@@ -0,0 +1,107 @@
+# pagination.py
+# Keyset ("seek") pagination. A page is found by comparing the sort columns
+# against the cursor row instead of OFFSET, so its cost depends on the page
+# size and an index on the sort columns, not on how deep the page is.
+
+from datetime import datetime
+
+from flask import request
+
+from extensions import db
+
+PER_PAGE = 50
+SORTS = ("newest", "oldest")
+CURSOR_SEP = "~"
+
+
+class KeysetPage:
+    def __init__(self, items, prev=None, next=None):
+        self.items = items
+        self.prev = prev    # cursor for ?prev=, or None on the first page
+        self.next = next    # cursor for ?next=, or None on the last page
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def to_dict(self, serialize):
+        return {"items": [serialize(item) for item in self.items],
+                "prev": self.prev, "next": self.next}
+
+
+def encode_cursor(values):
+    return CURSOR_SEP.join(v.isoformat() if isinstance(v, datetime) else str(v)
+                           for v in values)
+
+
+def decode_cursor(token, columns):
+    """Cursor values typed like `columns`, or None for a missing/garbled cursor."""
+    if not token:
+        return None
+    parts = token.rsplit(CURSOR_SEP, len(columns) - 1)
+    if len(parts) != len(columns):
+        return None
+    values = []
+    try:
+        for raw, col in zip(parts, columns):
+            kind = col.type.python_type
+            values.append(datetime.fromisoformat(raw) if kind is datetime else kind(raw))
+    except (TypeError, ValueError, NotImplementedError):
+        return None
+    return tuple(values)
+
+
+def keyset_page(query, columns, per_page=PER_PAGE, cursor=None, backwards=False,
+                descending=True):
+    """
+    One page of `query` ordered by `columns` (the last one must be unique).
+
+    Without a cursor this is the first page. With one, it is the page that
+    follows the cursor row, or precedes it when `backwards` is set.
+    """
+    if not isinstance(columns, (tuple, list)):
+        columns = (columns,)
+    values = decode_cursor(cursor, columns)
+
+    if values is not None:
+        lhs = db.tuple_(*columns) if len(columns) > 1 else columns[0]
+        rhs = db.tuple_(*values) if len(columns) > 1 else values[0]
+        # Forward in a descending list means smaller keys
+        query = query.filter(lhs < rhs if descending != backwards else lhs > rhs)
+
+    asc = descending == backwards
+    query = query.order_by(*[c.asc() if asc else c.desc() for c in columns])
+    rows = query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backwards:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = values is not None, more
+
+    if not rows:
+        return KeysetPage([])
+
+    def key(row):
+        return encode_cursor(getattr(row, c.key) for c in columns)
+
+    return KeysetPage(rows,
+                      prev=key(rows[0]) if has_prev else None,
+                      next=key(rows[-1]) if has_next else None)
+
+
+def page_from_request(query, columns, per_page=PER_PAGE):
+    """keyset_page() driven by the ?next=, ?prev= and ?sort=newest|oldest arguments."""
+    prev = request.args.get("prev")
+    return keyset_page(query, columns, per_page=per_page,
+                       cursor=prev or request.args.get("next"),
+                       backwards=bool(prev),
+                       descending=request.args.get("sort") != "oldest")
+
+
+def wants_json():
+    return request.args.get("format") == "json"
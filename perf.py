@@ -0,0 +1,180 @@
+# perf.py
+# Opt-in request instrumentation (PERF_ENABLED=1). For every request it
+# records wall time, SQL statement count and time, JSON encode/decode time
+# and template render time, and keeps a rolling window per endpoint for the
+# teacher-only /teacher/perf page. PERF_PROFILE_RATE > 0 also writes a
+# cProfile dump for that fraction of requests into PERF_PROFILE_DIR.
+
+import cProfile
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import jinja2
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+from extensions import db
+
+METRICS = ("wall", "sql_count", "sql_time", "json_time", "template_time")
+# Upper bounds (ms) of the wall-time histogram buckets; the last is open-ended
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def _percentile(sorted_values, pct):
+    i = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[i]
+
+
+class PerfRecorder:
+    """Last `window` samples per endpoint, shared by the threads of one process."""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.totals = defaultdict(int)   # requests per endpoint since start/reset
+
+    def record(self, endpoint, sample):
+        with self.lock:
+            self.samples[endpoint].append(sample)
+            self.totals[endpoint] += 1
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.totals.clear()
+
+    def snapshot(self):
+        with self.lock:
+            samples = {e: list(d) for e, d in self.samples.items()}
+            totals = dict(self.totals)
+
+        endpoints = {}
+        for endpoint, rows in samples.items():
+            stats = {}
+            for metric in METRICS:
+                values = sorted(r[metric] for r in rows)
+                stats[metric] = {
+                    "mean": round(sum(values) / len(values), 3),
+                    "p50": round(_percentile(values, 50), 3),
+                    "p95": round(_percentile(values, 95), 3),
+                    "p99": round(_percentile(values, 99), 3),
+                    "max": round(values[-1], 3),
+                }
+            histogram = [0] * (len(BUCKETS_MS) + 1)
+            for r in rows:
+                i = next((i for i, b in enumerate(BUCKETS_MS) if r["wall"] <= b), len(BUCKETS_MS))
+                histogram[i] += 1
+            endpoints[endpoint] = {
+                "window": len(rows),
+                "total": totals.get(endpoint, 0),
+                "histogram": histogram,
+                **stats,
+            }
+        return {"buckets_ms": list(BUCKETS_MS), "endpoints": endpoints}
+
+
+def _current():
+    """Per-request counters, or None outside an instrumented request."""
+    return g.get("_perf") if has_request_context() else None
+
+
+@contextmanager
+def timed(metric):
+    """Add the time spent in the block to the current request's `metric` (ms)."""
+    counters = _current()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if counters is not None:
+            counters[metric] += (time.perf_counter() - start) * 1e3
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with request/response (de)serialization timed."""
+
+    def dumps(self, obj, **kwargs):
+        with timed("json_time"):
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        with timed("json_time"):
+            return super().loads(s, **kwargs)
+
+
+class TimedTemplate(jinja2.Template):
+    # Only top-level renders go through here; extends/includes render inside them
+    def render(self, *args, **kwargs):
+        with timed("template_time"):
+            return super().render(*args, **kwargs)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None:
+        conn.info.setdefault("_perf_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counters = _current()
+    stack = conn.info.get("_perf_start")
+    if counters is not None and stack:
+        counters["sql_count"] += 1
+        counters["sql_time"] += (time.perf_counter() - stack.pop()) * 1e3
+
+
+def _start_request():
+    g._perf = {"start": time.perf_counter(), "sql_count": 0, "sql_time": 0.0,
+               "json_time": 0.0, "template_time": 0.0}
+    rate = current_app.config.get("PERF_PROFILE_RATE", 0)
+    if rate and random.random() < rate:
+        g._perf_profiler = cProfile.Profile()
+        g._perf_profiler.enable()
+
+
+def _finish_request(response):
+    counters = g.pop("_perf", None)
+    if counters is None:
+        return response
+    wall = (time.perf_counter() - counters.pop("start")) * 1e3
+    endpoint = request.url_rule.endpoint if request.url_rule else "<unmatched>"
+
+    profiler = g.pop("_perf_profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        out_dir = current_app.config.get("PERF_PROFILE_DIR") or os.path.join(
+            current_app.instance_path, "profiles")
+        os.makedirs(out_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(
+            out_dir, f"{endpoint}-{int(time.time() * 1000)}-{os.getpid()}.prof"))
+
+    current_app.extensions["perf"].record(endpoint, dict(counters, wall=wall))
+    response.headers["Server-Timing"] = (
+        f"app;dur={wall:.1f}, sql;dur={counters['sql_time']:.1f};desc=\"{counters['sql_count']} queries\", "
+        f"tpl;dur={counters['template_time']:.1f}, json;dur={counters['json_time']:.1f}")
+    return response
+
+
+def install_perf(app):
+    """Hook the instrumentation into `app` when PERF_ENABLED is set."""
+    if not app.config.get("PERF_ENABLED"):
+        app.extensions["perf"] = None
+        return None
+
+    recorder = PerfRecorder(window=app.config.get("PERF_WINDOW", 1000))
+    app.extensions["perf"] = recorder
+
+    app.json = TimedJSONProvider(app)
+    app.jinja_env.template_class = TimedTemplate
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", _after_cursor_execute)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    return recorder
@@ -0,0 +1,185 @@
+# question_import.py
+# Shared question import pipeline used by the teacher upload route and by
+# import_from_excel.py. Rows are streamed (never loaded whole), matched to
+# existing questions through the indexed prompt_hash column in batches, and
+# written with bulk insert/update per chunk.
+
+import csv
+import io
+import json
+
+from extensions import db
+from models import Question, prompt_hash
+
+CHUNK_SIZE = 500
+
+# Header names understood in the first row. Without a recognised header the
+# columns are read positionally in this order.
+COLUMNS = ("Question", "Op1", "Op2", "Op3", "Op4", "CorrectOp", "Difficulty")
+HEADER_ALIASES = {"correct": "CorrectOp"}
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.added = 0
+        self.updated = 0
+        self.skipped = []   # (line number, reason)
+
+
+def normalize_difficulty(raw):
+    if raw is None:
+        return 1
+    try:
+        diff = int(float(raw))  # "3", 3 and 3.0 (numeric spreadsheet cells)
+    except (TypeError, ValueError):
+        return 1
+
+    # FIX RULES
+    if diff <= 0:
+        return 1
+    if diff > 10:
+        return 10
+    return diff
+
+
+def _cell(val):
+    if val is None:
+        return ""
+    if isinstance(val, float) and val.is_integer():
+        val = int(val)  # openpyxl reads numeric cells as floats: 3.0 -> "3", not "3.0"
+    return str(val).strip()
+
+
+def iter_sheet_rows(stream, filename):
+    """
+    Yield (line number, tuple of cells) from an .xlsx or .csv stream without
+    materializing the whole sheet.
+    """
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        import openpyxl  # ImportError is reported by the caller
+        wb = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+        try:
+            for i, row in enumerate(wb.active.iter_rows(values_only=True), start=1):
+                yield i, row
+        finally:
+            wb.close()
+    elif name.endswith(".csv"):
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+        for i, row in enumerate(csv.reader(text), start=1):
+            yield i, row
+    else:
+        raise ValueError("Only .xlsx or .csv files supported.")
+
+
+def _column_positions(header):
+    """Map column name -> index from the header row, or positional defaults."""
+    names = [_cell(h).lower() for h in header]
+    positions = {}
+    for col in COLUMNS:
+        if col.lower() in names:
+            positions[col] = names.index(col.lower())
+    for alias, col in HEADER_ALIASES.items():
+        if col not in positions and alias in names:
+            positions[col] = names.index(alias)
+    if "Question" not in positions:
+        positions = {col: i for i, col in enumerate(COLUMNS)}
+    return positions
+
+
+def parse_row(row, positions):
+    """Validate one row. Returns a dict of Question fields or raises ValueError(reason)."""
+    def get(col):
+        i = positions.get(col)
+        return _cell(row[i]) if i is not None and i < len(row) else ""
+
+    prompt = get("Question")
+    if not prompt:
+        raise ValueError("❌ Missing Question")
+
+    options = []
+    for i in range(1, 5):
+        val = get(f"Op{i}")
+        if val:
+            options.append({"id": str(i), "text": val})
+    if len(options) < 2:
+        raise ValueError("❌ Need at least 2 options")
+
+    correct = get("CorrectOp")
+    if not correct:
+        raise ValueError("❌ Missing CorrectOp")
+
+    return {
+        "prompt": prompt,
+        "prompt_hash": prompt_hash(prompt),
+        "options_json": json.dumps(options, ensure_ascii=False),
+        "correct_answers": correct,
+        "difficulty": normalize_difficulty(get("Difficulty") or None),
+        "qtype": "single",
+    }
+
+
+def _flush_chunk(chunk, report):
+    # Last row wins when a prompt repeats inside the chunk
+    by_hash = {}
+    for fields in chunk:
+        by_hash[fields["prompt_hash"]] = fields
+
+    existing = dict(
+        db.session.query(Question.prompt_hash, Question.id)
+        .filter(Question.prompt_hash.in_(list(by_hash)))
+    )
+
+    inserts, updates = [], []
+    for h, fields in by_hash.items():
+        if h in existing:
+            updates.append({
+                "id": existing[h],
+                "options_json": fields["options_json"],
+                "correct_answers": fields["correct_answers"],
+                "difficulty": fields["difficulty"],
+            })
+        else:
+            inserts.append(fields)
+
+    if inserts:
+        db.session.bulk_insert_mappings(Question, inserts)
+    if updates:
+        db.session.bulk_update_mappings(Question, updates)
+    db.session.flush()
+
+    report.added += len(inserts)
+    report.updated += len(updates)
+
+
+def import_questions(rows, chunk_size=CHUNK_SIZE):
+    """
+    Upsert questions from an iterable of (line number, cells), the first of
+    which is the header. Runs in the current transaction; the caller commits.
+    """
+    report = ImportReport()
+    positions = None
+    chunk = []
+
+    for lineno, row in rows:
+        if positions is None:
+            positions = _column_positions(row or ())
+            continue
+        if not row or not any(_cell(v) for v in row):
+            continue  # blank line
+
+        report.rows += 1
+        try:
+            chunk.append(parse_row(row, positions))
+        except ValueError as e:
+            report.skipped.append((lineno, str(e)))
+            continue
+
+        if len(chunk) >= chunk_size:
+            _flush_chunk(chunk, report)
+            chunk = []
+
+    if chunk:
+        _flush_chunk(chunk, report)
+    return report
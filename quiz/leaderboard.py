@@ -0,0 +1,92 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+from models import LeaderboardEntry, User
+
+# How long (seconds) a worker serves a board before reloading it
+CACHE_SECONDS = 5.0
+TOP_K = 50
+
+
+class Board:
+    """One loaded leaderboard: the top rows plus every score, for ranking by bisect."""
+
+    def __init__(self, top, scores, loaded_at):
+        self.top = top            # [{"rank", "user_id", "username", "best", "achieved_at"}]
+        self.scores = scores      # negated best scores, ascending (i.e. best first)
+        self.loaded_at = loaded_at
+
+    def __len__(self):
+        return len(self.scores)
+
+    def rank_of(self, best):
+        """1-based competition rank (ties share a rank) of a score on this board."""
+        return bisect_left(self.scores, -best) + 1
+
+
+class LeaderboardCache:
+    """
+    Process-wide cache of loaded boards. Entries are maintained in the
+    database by Attempt.close(); each worker re-reads a board at most every
+    CACHE_SECONDS, so top-K is a dict lookup and a rank is O(log n).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boards = {}         # (mode, period, period_key) -> Board
+
+    def _load(self, mode, period, at):
+        board = LeaderboardEntry.board(mode, period, at)
+        rows = (board.join(User, User.id == LeaderboardEntry.user_id)
+                .with_entities(LeaderboardEntry.user_id, User.username,
+                               LeaderboardEntry.best, LeaderboardEntry.achieved_at)
+                .order_by(LeaderboardEntry.best.desc(), LeaderboardEntry.achieved_at.asc())
+                .limit(TOP_K).all())
+        # Scores only: a covering read of ix_leaderboard_rank
+        scores = array("l", (-b for (b,) in board.with_entities(LeaderboardEntry.best)
+                                              .order_by(LeaderboardEntry.best.desc())))
+        top, rank = [], 0
+        for i, (user_id, username, best, achieved_at) in enumerate(rows):
+            if not top or best != top[-1]["best"]:
+                rank = i + 1
+            top.append({"rank": rank, "user_id": user_id, "username": username, "best": best,
+                        "achieved_at": achieved_at.isoformat() if achieved_at else None})
+        return Board(top, scores, time.monotonic())
+
+    def board(self, mode, period, at=None):
+        at = at or datetime.utcnow()
+        key = (mode, period, LeaderboardEntry.period_key_for(period, at))
+        with self._lock:
+            cached = self._boards.get(key)
+            if cached and time.monotonic() - cached.loaded_at < CACHE_SECONDS:
+                return cached
+        loaded = self._load(mode, period, at)
+        with self._lock:
+            # Forget boards of past days and weeks
+            self._boards = {k: b for k, b in self._boards.items()
+                            if k[2] == LeaderboardEntry.period_key_for(k[1], at)}
+            self._boards[key] = loaded
+        return loaded
+
+    def my_rank(self, mode, period, user_id, at=None):
+        """{"rank", "best", "of"} for one student, or None if they are not on the board."""
+        at = at or datetime.utcnow()
+        best = (LeaderboardEntry.board(mode, period, at)
+                .filter(LeaderboardEntry.user_id == user_id)
+                .with_entities(LeaderboardEntry.best).scalar())
+        if best is None:
+            return None
+        board = self.board(mode, period, at)
+        # The student's own row is read fresh; the others may be CACHE_SECONDS old
+        rank = board.rank_of(best)
+        return {"rank": rank, "best": best, "of": max(len(board), rank)}
+
+    def invalidate(self):
+        with self._lock:
+            self._boards = {}
+
+
+leaderboards = LeaderboardCache()
@@ -1,2 +1,74 @@
-# This file is intentionally minimal to allow dynamic imports in routes.py
-# Do not import specific modes here to avoid circular dependencies or naming conflicts.
\ No newline at end of file
+# Quiz mode plugins.
+#
+# Every module in this package that defines `get_question` is a mode. The
+# registry is built once by load_modes() in create_app, so request handlers
+# dispatch with a dict lookup instead of importing modules per request.
+#
+# A mode module provides:
+#   get_question(attempt, state)                      -> Question or None   (required)
+#   handle_result(attempt, key, correct, time_used)   -> (points, adjustment) (optional, 1 point per correct answer)
+#   start_attempt(attempt, state)                     -> None               (optional)
+#   is_finished(attempt, state)                       -> message or None    (optional)
+#   PREFETCH = True   questions don't depend on earlier answers, so clients may
+#                     prefetch bundles and batch-submit answers (optional)
+#   LEADERBOARD = True  scores are comparable between students, so the mode
+#                       gets public leaderboards (optional)
+
+import importlib
+import pkgutil
+from collections import namedtuple
+from flask import current_app
+
+Mode = namedtuple("Mode", "name start next_question score finished prefetch leaderboard")
+
+OPTIONAL_HOOKS = ("start_attempt", "handle_result", "is_finished")
+
+
+def _noop(*args, **kwargs):
+    return None
+
+
+def _one_point(attempt, question, correct, time_used=None):
+    return (1 if correct else 0), {}
+
+
+def load_modes(app):
+    """Discover, validate and register every mode module on the app."""
+    modes = {}
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith("_"):
+            continue
+        mod = importlib.import_module(f"{__name__}.{info.name}")
+        if not hasattr(mod, "get_question"):
+            continue  # helper module (e.g. common)
+
+        bad = [h for h in ("get_question",) + OPTIONAL_HOOKS
+               if hasattr(mod, h) and not callable(getattr(mod, h))]
+        if bad:
+            raise RuntimeError(f"Quiz mode '{info.name}' has non-callable {', '.join(bad)}")
+
+        modes[info.name] = Mode(
+            name=info.name,
+            start=getattr(mod, "start_attempt", _noop),
+            next_question=mod.get_question,
+            score=getattr(mod, "handle_result", _one_point),
+            finished=getattr(mod, "is_finished", _noop),
+            prefetch=bool(getattr(mod, "PREFETCH", False)),
+            leaderboard=bool(getattr(mod, "LEADERBOARD", False)),
+        )
+
+    app.extensions["quiz_modes"] = modes
+    return modes
+
+
+def get_mode(name):
+    """Registered mode by name, or None for unknown modes."""
+    return current_app.extensions["quiz_modes"].get((name or "").lower())
+
+
+def mode_names():
+    return sorted(current_app.extensions["quiz_modes"])
+
+
+def leaderboard_modes():
+    return sorted(name for name, m in current_app.extensions["quiz_modes"].items() if m.leaderboard)
@@ -1,30 +1,45 @@
-from .common import pick_question_near
+from .irt import (PRIOR_SD, ability_prior, item_parameters, logit_to_level,
+                  pick_most_informative, update_ability)
 
-def get_question(current_diff, seen):
+# Start from the student's estimate in their previous adaptive attempt
+CARRY_ABILITY = True
+
+def _estimate(state):
+    # Attempts started before the IRT engine have no estimate yet
+    if state.ability is None:
+        return 0.0, PRIOR_SD
+    return state.ability, state.ability_se or PRIOR_SD
+
+def start_attempt(attempt, state):
     """
-    Adaptive mode: tries to find questions matching the current skill level.
+    Adaptive mode keeps a running ability estimate (logits) per attempt.
+    A carried-over estimate restarts with the prior's uncertainty, so it
+    can still move quickly if the student has changed.
     """
-    return pick_question_near(current_diff, exclude_ids=seen)
+    state.ability = ability_prior(attempt.user_id, attempt.id) if CARRY_ABILITY else 0.0
+    state.ability_se = PRIOR_SD
+    state.current_diff = logit_to_level(state.ability)
 
-def handle_result(attempt, question, correct, time_used=None):
+def get_question(attempt, state):
     """
-    Adjust difficulty based on performance.
+    Adaptive mode: the unseen question that tells us the most about the
+    student, i.e. the one whose difficulty is closest to their ability.
     """
-    try:
-        t = float(time_used or 0)
-    except: t = 0
-
-    cur = question.difficulty or 3
-    nxt = cur
+    theta, _ = _estimate(state)
+    return pick_most_informative(theta, exclude_ids=state.seen)
 
-    if t > 10: # Too slow
-        nxt = max(1, cur - 1)
-        rule = "decrease_slow"
-    elif not correct: # Wrong
-        nxt = max(1, cur - 1)
-        rule = "decrease_wrong"
-    else: # Correct and fast enough
-        nxt = min(10, cur + 1)
-        rule = "increase"
+def handle_result(attempt, question, correct, time_used=None):
+    """
+    Update the ability estimate from the answer. current_diff follows the
+    estimate on the 1-10 scale for the client's display.
+    """
+    theta, se = _estimate(attempt.get_state())
+    b = item_parameters.difficulty(question.qid, question.difficulty)
+    theta, se = update_ability(theta, se, b, correct)
 
-    return (1 if correct else 0), {"next_diff": nxt, "rule": rule}
\ No newline at end of file
+    return (1 if correct else 0), {
+        "next_diff": logit_to_level(theta),
+        "ability": round(theta, 4),
+        "ability_se": round(se, 4),
+        "rule": "irt",
+    }
@@ -1,16 +1,8 @@
-import random
-from models import Question
 from .common import pick_question_near
 
-def get_question(current_diff, seen):
+def get_question(attempt, state):
     """
     Challenger: Stick to the difficulty, fallback if needed.
     """
-    # Strict filter first
-    pool = Question.query.filter_by(difficulty=current_diff).all()
-    valid = [q for q in pool if q.id not in seen]
-    
-    if valid:
-        return random.choice(valid)
-        
-    return pick_question_near(current_diff, seen)
\ No newline at end of file
+    # pick_question_near tries the exact difficulty first, then widens
+    return pick_question_near(state.current_diff, state.seen)
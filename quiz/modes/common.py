@@ -1,43 +1,292 @@
 import random
-from models import Question
+import threading
+import time
+from array import array
+from extensions import db
+from models import Question, BankRevision, QuestionOrder
 
-def get_pool_all(exclude_ids=None):
+MIN_DIFF, MAX_DIFF = 1, 10
+DEFAULT_DIFF = 3
+
+# How often (seconds) a worker re-checks the shared bank revision
+REVISION_CHECK_INTERVAL = 2.0
+# Random probes before falling back to a scan of the candidate buckets
+PICK_ATTEMPTS = 8
+
+
+def clamp_difficulty(diff):
+    try:
+        diff = int(diff)
+    except (TypeError, ValueError):
+        return DEFAULT_DIFF
+    return max(MIN_DIFF, min(MAX_DIFF, diff))
+
+
+def bump_bank_revision():
     """
-    Get all questions, excluding specific IDs.
+    Mark the question bank as changed. Call inside the same transaction as
+    the question write; the caller commits.
     """
-    exclude_ids = exclude_ids or []
-    # Optimization: If exclude list is empty, don't filter
+    rev = db.session.get(BankRevision, 1)
+    if rev is None:
+        rev = BankRevision(id=1, revision=0)
+        db.session.add(rev)
+    rev.revision = (rev.revision or 0) + 1
+    return rev.revision
+
+
+class QuestionIndex:
+    """
+    Process-wide index of the question bank: compact id arrays bucketed by
+    difficulty 1-10. Holds only ids and difficulty, so picking a question
+    never hydrates prompts or options of the questions we don't serve.
+
+    Teacher routes update it incrementally after they commit. Other worker
+    processes notice changes through BankRevision and rebuild.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buckets = None          # {difficulty: array of ids}
+        self._where = {}              # qid -> (difficulty, position)
+        self._max_id = 0
+        self._revision = None
+        self._checked_at = 0.0
+
+    # --- loading ---
+    def _db_revision(self):
+        rev = db.session.query(BankRevision.revision).filter_by(id=1).scalar()
+        return rev or 0
+
+    def _rebuild(self):
+        # Read the revision first so a concurrent change triggers another rebuild
+        revision = self._db_revision()
+        buckets = {d: array("l") for d in range(MIN_DIFF, MAX_DIFF + 1)}
+        where = {}
+        for qid, diff in db.session.query(Question.id, Question.difficulty):
+            d = clamp_difficulty(diff)
+            where[qid] = (d, len(buckets[d]))
+            buckets[d].append(qid)
+        self._buckets = buckets
+        self._where = where
+        self._max_id = max(where, default=0)
+        self._revision = revision
+        self._checked_at = time.monotonic()
+
+    def _ensure(self):
+        with self._lock:
+            if self._buckets is None:
+                self._rebuild()
+                return
+            now = time.monotonic()
+            if now - self._checked_at < REVISION_CHECK_INTERVAL:
+                return
+            self._checked_at = now
+            if self._db_revision() != self._revision:
+                self._rebuild()
+
+    def invalidate(self):
+        with self._lock:
+            self._buckets = None
+            self._where = {}
+
+    # --- incremental maintenance ---
+    def _sync_revision(self, revision):
+        # Only trust our incremental update if no other process changed the
+        # bank in between; otherwise force a rebuild on next use.
+        if revision is None or self._revision is None or revision != self._revision + 1:
+            self.invalidate()
+        else:
+            self._revision = revision
+
+    def _remove(self, qid):
+        loc = self._where.pop(qid, None)
+        if loc is None:
+            return
+        d, pos = loc
+        bucket = self._buckets[d]
+        last = bucket.pop()
+        if last != qid:
+            bucket[pos] = last
+            self._where[last] = (d, pos)
+
+    def _insert(self, qid, diff):
+        d = clamp_difficulty(diff)
+        self._where[qid] = (d, len(self._buckets[d]))
+        self._buckets[d].append(qid)
+        self._max_id = max(self._max_id, qid)
+
+    def add(self, qid, diff, revision=None):
+        with self._lock:
+            if self._buckets is None:
+                return
+            self._remove(qid)
+            self._insert(qid, diff)
+            self._sync_revision(revision)
+
+    def update(self, qid, diff, revision=None):
+        self.add(qid, diff, revision)
+
+    def discard(self, qid, revision=None):
+        with self._lock:
+            if self._buckets is None:
+                return
+            self._remove(qid)
+            self._sync_revision(revision)
+
+    # --- queries ---
+    # Each query loads and reads the index under the lock, so a concurrent
+    # invalidate() can't empty it between the two.
+    def revision(self):
+        """Bank revision the index currently reflects (checked periodically)."""
+        with self._lock:
+            self._ensure()
+            return self._revision
+
+    def count(self):
+        with self._lock:
+            self._ensure()
+            return len(self._where)
+
+    def contains(self, qid):
+        with self._lock:
+            self._ensure()
+            return qid in self._where
+
+    def max_id(self):
+        """Highest question id seen so far (not lowered by deletes)."""
+        with self._lock:
+            self._ensure()
+            return self._max_id
+
+    def pick(self, difficulties=None, exclude=None):
+        """
+        Return a random question id from the given difficulty buckets (all
+        buckets if None) that is not in `exclude`, or None.
+        """
+        with self._lock:
+            self._ensure()
+            if difficulties is None:
+                difficulties = range(MIN_DIFF, MAX_DIFF + 1)
+            buckets = [self._buckets[d] for d in difficulties if self._buckets.get(d)]
+            total = sum(len(b) for b in buckets)
+            if not total:
+                return None
+
+            # Fast path: a few O(1) random probes
+            for _ in range(PICK_ATTEMPTS):
+                r = random.randrange(total)
+                for b in buckets:
+                    if r < len(b):
+                        qid = b[r]
+                        break
+                    r -= len(b)
+                if not exclude or qid not in exclude:
+                    return qid
+
+            if not exclude:
+                return None
+            # Most of the candidates are excluded: scan the ids only
+            valid = [qid for b in buckets for qid in b if qid not in exclude]
+            return random.choice(valid) if valid else None
+
+
+question_index = QuestionIndex()
+
+
+def _as_exclude(exclude_ids):
     if not exclude_ids:
-        return Question.query.all()
-    
-    # Filter in Python to avoid complex IN clauses if list is huge, 
-    # but for typical quiz app SQL filter is fine.
-    # We use a list comprehension for robust excluding.
-    all_q = Question.query.all()
-    pool = [q for q in all_q if q.id not in exclude_ids]
-    return pool
+        return None
+    if isinstance(exclude_ids, (list, tuple)):
+        return set(exclude_ids)
+    return exclude_ids
+
+
+def _load(pick):
+    """Load the picked question, dropping ids deleted by another process."""
+    for _ in range(PICK_ATTEMPTS):
+        qid = pick()
+        if qid is None:
+            return None
+        q = db.session.get(Question, qid)
+        if q is not None:
+            return q
+        question_index.invalidate()
+    return None
+
+
+def pick_random(exclude_ids=None):
+    """
+    Pick a random question from the whole bank, excluding specific IDs.
+    """
+    exclude = _as_exclude(exclude_ids)
+    return _load(lambda: question_index.pick(None, exclude))
+
+
+def start_order(state):
+    """Give the attempt a fresh seeded order over the current bank."""
+    order = QuestionOrder.start(question_index.max_id())
+    state.save_order(order)
+    return order
+
+
+def pick_in_order(state, reshuffle=False):
+    """
+    Serve the attempt's next question from its seeded order (see
+    QuestionOrder): each step is O(1) whatever is left unseen. Ids deleted
+    since the order was made are skipped; questions added later only come
+    in with a reshuffle. With `reshuffle`, running out starts a new pass
+    over the current bank in a new order instead of returning None.
+
+    Ids still pending (served, not answered yet) are passed over, so a new
+    pass doesn't repeat what the client has queued or a bundle already
+    holds; one comes back only when every question is pending.
+    """
+    order = state.order
+    if order is None:
+        # Attempts started before orders existed pick up where they are;
+        # the first pass skips what they have already seen
+        order = start_order(state)
+    seen, pending = state.seen, state.pending
+
+    def pick():
+        nonlocal order
+        fallback, wrapped = None, False
+        while True:
+            qid = order.next_id()
+            if qid is None:
+                # A whole pass without a free question: serve a pending one
+                if not reshuffle or wrapped or not question_index.count():
+                    return fallback
+                order = order.reshuffled(question_index.max_id())
+                wrapped = True
+                continue
+            if not question_index.contains(qid) or (order.passes == 0 and qid in seen):
+                continue
+            if qid in pending:
+                fallback = fallback or qid
+                continue
+            return qid
+
+    q = _load(pick)
+    state.save_order(order)
+    return q
+
 
 def pick_question_near(diff, exclude_ids=None):
     """
     Pick a question near the target difficulty.
     """
-    exclude_ids = exclude_ids or []
-    
-    # Try exact match
-    pool = Question.query.filter_by(difficulty=diff).all()
-    valid_pool = [q for q in pool if q.id not in exclude_ids]
-    
-    if valid_pool:
-        return random.choice(valid_pool)
-
-    # Try +/- 1 range
-    low = max(1, diff - 1)
-    high = min(10, diff + 1)
-    pool = Question.query.filter(Question.difficulty.between(low, high)).all()
-    valid_pool = [q for q in pool if q.id not in exclude_ids]
-    
-    if valid_pool:
-        return random.choice(valid_pool)
-
-    # Fallback to anything available
-    return random.choice(get_pool_all(exclude_ids)) if get_pool_all(exclude_ids) else None
\ No newline at end of file
+    exclude = _as_exclude(exclude_ids)
+    diff = clamp_difficulty(diff)
+
+    def pick():
+        # Try exact match, then +/- 1 range, then anything available
+        near = range(max(MIN_DIFF, diff - 1), min(MAX_DIFF, diff + 1) + 1)
+        for diffs in ([diff], near, None):
+            qid = question_index.pick(diffs, exclude)
+            if qid is not None:
+                return qid
+        return None
+
+    return _load(pick)
@@ -0,0 +1,127 @@
+# IRT helpers for the adaptive mode (a helper module: no get_question).
+#
+# Questions are placed on the Rasch logit scale: calibrated ones at their
+# ItemCalibration.rasch_b (see item_analysis.py), the rest at their teacher-set
+# level mapped onto the same scale. A student's ability is kept as a normal
+# estimate (theta, se) updated after every answer. Under the Rasch model a
+# question is most informative where b == theta, so picking means a bisect
+# into the questions sorted by b and a short walk outwards.
+
+import math
+import random
+import threading
+from array import array
+from bisect import bisect_left
+
+from extensions import db
+from models import Attempt, AttemptState, ItemCalibration, Question
+from .common import MIN_DIFF, MAX_DIFF, _load, question_index
+
+# Levels 1-10 <-> logits: level 5.5 is b = 0, +-3 logits reach levels 1 and 10
+LEVEL_CENTER, LEVELS_PER_LOGIT = 5.5, 1.5
+PRIOR_SD = 1.0          # uncertainty of the starting estimate, logits
+ABILITY_BOUND = 6.0     # estimates stay within +-ABILITY_BOUND
+CANDIDATES = 5          # pick at random among this many most informative unseen questions
+
+
+def level_to_logit(level):
+    return (level - LEVEL_CENTER) / LEVELS_PER_LOGIT
+
+
+def logit_to_level(b):
+    return max(MIN_DIFF, min(MAX_DIFF, int(round(LEVEL_CENTER + b * LEVELS_PER_LOGIT))))
+
+
+def update_ability(theta, se, b, correct):
+    """
+    Bayesian update of a N(theta, se^2) ability after one answer to a
+    question of difficulty b: one Newton step on the log posterior, so the
+    estimate moves by (observed - expected) / precision and the precision
+    grows by the answer's information p(1 - p). Returns (theta, se).
+    """
+    p = 1.0 / (1.0 + math.exp(b - theta))
+    precision = 1.0 / (se * se) + p * (1.0 - p)
+    theta += ((1.0 if correct else 0.0) - p) / precision
+    theta = max(-ABILITY_BOUND, min(ABILITY_BOUND, theta))
+    return theta, 1.0 / math.sqrt(precision)
+
+
+def ability_prior(user_id, exclude_attempt_id=None):
+    """The student's estimate from their latest adaptive attempt, or 0 (average)."""
+    theta = (db.session.query(AttemptState.ability)
+             .join(Attempt, Attempt.id == AttemptState.attempt_id)
+             .filter(Attempt.user_id == user_id, Attempt.mode == "adaptive",
+                     Attempt.id != exclude_attempt_id, AttemptState.ability.isnot(None))
+             .order_by(Attempt.started_at.desc())
+             .limit(1).scalar())
+    return theta if theta is not None else 0.0
+
+
+class ItemParameterIndex:
+    """
+    Process-wide index of question ids sorted by difficulty in logits.
+    Rebuilt when the bank revision changes, which includes edits and item
+    analysis runs, so a pick costs O(log n) plus the walk past seen ids.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._b = array("d")        # ascending
+        self._ids = array("l")      # question ids, aligned with _b
+        self._b_of = {}             # qid -> b
+        self._revision = None
+
+    def _ensure(self):
+        revision = question_index.revision()
+        if revision == self._revision:
+            return
+        rows = (db.session.query(Question.id, Question.difficulty, ItemCalibration.rasch_b)
+                .outerjoin(ItemCalibration, db.and_(ItemCalibration.qid == Question.id,
+                                                    ItemCalibration.calibrated.isnot(None))))
+        b_of = {qid: b if b is not None else level_to_logit(diff or LEVEL_CENTER)
+                for qid, diff, b in rows}
+        ordered = sorted((b, qid) for qid, b in b_of.items())
+        with self._lock:
+            self._b = array("d", (b for b, _ in ordered))
+            self._ids = array("l", (qid for _, qid in ordered))
+            self._b_of = b_of
+            self._revision = revision
+
+    def invalidate(self):
+        with self._lock:
+            self._revision = None
+
+    def difficulty(self, qid, level=None):
+        """Difficulty of a question in logits; `level` is the fallback for unknown ids."""
+        self._ensure()
+        b = self._b_of.get(qid)
+        return b if b is not None else level_to_logit(level or LEVEL_CENTER)
+
+    def pick(self, theta, exclude=None, candidates=CANDIDATES):
+        """
+        Id of an unseen question among the `candidates` closest to theta in
+        difficulty (the most informative ones), or None. Choosing at random
+        among them keeps students of equal ability off identical sequences.
+        """
+        self._ensure()
+        with self._lock:
+            bs, ids = self._b, self._ids
+        lo = bisect_left(bs, theta) - 1
+        hi = lo + 1
+        found = []
+        while len(found) < candidates and (lo >= 0 or hi < len(ids)):
+            if hi >= len(ids) or (lo >= 0 and theta - bs[lo] <= bs[hi] - theta):
+                qid, lo = ids[lo], lo - 1
+            else:
+                qid, hi = ids[hi], hi + 1
+            if not exclude or qid not in exclude:
+                found.append(qid)
+        return random.choice(found) if found else None
+
+
+item_parameters = ItemParameterIndex()
+
+
+def pick_most_informative(theta, exclude_ids=None):
+    """Load an unseen question near-maximally informative at ability theta."""
+    return _load(lambda: item_parameters.pick(theta, exclude_ids))
@@ -1,29 +1,21 @@
-import random
-from .common import get_pool_all
+from .common import pick_in_order, start_order
 
-def get_question(current_diff, seen):
+# Picks don't depend on earlier answers: clients may prefetch and batch-submit
+PREFETCH = True
+
+def start_attempt(attempt, state):
+    """Shuffle the bank once; the attempt then walks through it."""
+    start_order(state)
+
+def get_question(attempt, state):
     """
     Level Infinity Mode:
-    - Randomly selects questions.
+    - Serves questions in the attempt's shuffled order.
     - No time limit (handled by client/routes not enforcing one).
-    - If all questions have been seen, it DOES NOT end. 
-      It simply picks a random question from the entire pool again.
+    - If all questions have been seen, it DOES NOT end.
+      It reshuffles the whole bank and goes round again.
     """
-    # 1. Try to get unseen questions first
-    pool = get_pool_all(exclude_ids=seen)
-    
-    if pool:
-        return random.choice(pool)
-    
-    # 2. If pool is empty (all seen), fetch ALL questions to repeat
-    # We pass empty exclude list to get everything
-    full_pool = get_pool_all(exclude_ids=[])
-    
-    if full_pool:
-        # We return a random question to keep the game going
-        return random.choice(full_pool)
-        
-    return None
+    return pick_in_order(state, reshuffle=True)
 
 def handle_result(attempt, question, correct, time_used=None):
     """
@@ -1,18 +1,23 @@
-import random
-from .common import get_pool_all
+from .common import pick_in_order, start_order
 
-def get_question(current_diff, seen):
+# Picks don't depend on earlier answers: clients may prefetch and batch-submit
+PREFETCH = True
+# Everyone gets the same minute, so scores rank fairly
+LEADERBOARD = True
+
+def start_attempt(attempt, state):
+    """Shuffle the bank once; the attempt then walks through it."""
+    start_order(state)
+
+def get_question(attempt, state):
     """
     Minute Rush Mode:
-    - Fetches questions randomly from the pool of unseen questions.
+    - Serves the unseen questions in the attempt's shuffled order.
     - Does NOT adjust difficulty (pure random or can be set to random within range if desired).
     - Returns None if no questions left.
     """
-    # 1. Get all unseen questions
-    pool = get_pool_all(exclude_ids=seen)
-    
-    # 2. Return random choice or None
-    return random.choice(pool) if pool else None
+    # Next question in the order, or None when the bank is exhausted
+    return pick_in_order(state)
 
 def handle_result(attempt, question, correct, time_used=None):
     """
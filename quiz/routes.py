@@ -3,12 +3,23 @@ from flask import (
 )
 from flask_login import login_required, current_user
 from extensions import db
-from models import Question, Attempt, User
+from models import Attempt, UserStats, LeaderboardEntry, ATTEMPT_ORDER
+from pagination import keyset_page, page_from_request, wants_json
+from sqlalchemy import func
+from sqlalchemy.orm import undefer
 from . import quiz_bp
-import random
+from .leaderboard import leaderboards
+from .modes import get_mode, leaderboard_modes, mode_names
+from .modes.common import question_index
+from .scoring import answer_keys, is_correct
+from .summary import attempt_summary
+from write_behind import AnswerBatch, wait_for_attempt, write_behind
 import json
 from datetime import datetime
-import importlib
+
+# Prefetch bundle size limits for /api/get_questions
+PREFETCH_DEFAULT = 5
+PREFETCH_MAX = 10
 
 # -------------------------------
 # VIEWS
@@ -21,8 +32,7 @@ def start():
 @quiz_bp.route("/start/<mode>")
 @login_required
 def start_mode(mode):
-    valid = ["adaptive", "challenger", "minuterush", "firststrike", "levelinfinity"]
-    if mode not in valid:
+    if get_mode(mode) is None:
         flash("Invalid mode.", "danger")
         return redirect(url_for("quiz.start"))
     return render_template("quiz.html", mode=mode)
@@ -30,8 +40,23 @@ def start_mode(mode):
 @quiz_bp.route("/run/<mode>")
 @login_required
 def run_quiz(mode):
+    if get_mode(mode) is None:
+        flash("Invalid mode.", "danger")
+        return redirect(url_for("quiz.start"))
     return render_template("quiz.html", mode=mode)
 
+def load_own_attempt(attempt_id):
+    """The current user's attempt with this id, or None."""
+    try:
+        attempt_id = int(attempt_id)
+    except (TypeError, ValueError):
+        return None
+    wait_for_attempt(attempt_id)
+    attempt = db.session.get(Attempt, attempt_id)
+    if not attempt or attempt.user_id != current_user.id:
+        return None
+    return attempt
+
 # -------------------------------
 # API: START ATTEMPT
 # -------------------------------
@@ -39,13 +64,16 @@ def run_quiz(mode):
 @login_required
 def start_attempt_api():
     data = request.get_json() or {}
-    mode = data.get("mode", "adaptive")
+    mode = get_mode(data.get("mode") or "adaptive")
     params = data.get("params", {})
 
+    if mode is None:
+        return jsonify({"error": "Invalid mode"}), 400
+
     # Create Attempt Record
     attempt = Attempt(
         user_id=current_user.id,
-        mode=mode,
+        mode=mode.name,
         score=0,
         details=json.dumps([{
             "action": "start",
@@ -54,22 +82,166 @@ def start_attempt_api():
         }])
     )
     db.session.add(attempt)
-    db.session.commit()
+    db.session.flush()
 
-    # Special Init for First Strike
-    if mode == "firststrike":
-        try:
-            from quiz.modes.firststrike import start_attempt as fs_start
-            fs_start(attempt)
-            db.session.commit()
-        except ImportError:
-            return jsonify({"error": "Mode error. Please restart server."}), 500
-        except Exception as e:
-            current_app.logger.error(f"FS Init Error: {e}")
-            return jsonify({"error": "Initialization failed"}), 500
+    try:
+        mode.start(attempt, attempt.get_state())
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"{mode.name} init error: {e}")
+        return jsonify({"error": "Initialization failed"}), 500
+    db.session.commit()
 
     return jsonify({"attempt_id": attempt.id})
 
+# -------------------------------
+# HELPERS
+# -------------------------------
+def question_payload(q, state):
+    """Client view of a question. Answer keys are never included."""
+    return {
+        "id": q.id,
+        "prompt": q.prompt,
+        "options": json.loads(q.options_json or "[]"),
+        "difficulty": q.difficulty,
+        "qtype": q.qtype,
+        "state": state.to_dict()
+    }
+
+def normalize_selection(selected):
+    if isinstance(selected, list):
+        return [str(x).strip() for x in selected if x is not None]
+    if selected is not None:
+        return [str(selected).strip()]
+    return []
+
+def score_answer(attempt, mode, state, qid, selected, time_used, defer=False):
+    """
+    Score one answer and record it on the attempt.
+    Returns (result, http_status); the caller commits. With `defer` nothing
+    is written: the event stays on the attempt and closing is left to the
+    write-behind queue (see save_answers()).
+    """
+    if attempt.closed_at or mode.finished(attempt, state):
+        return {"error": "Attempt already finished"}, 409
+
+    sel_list = normalize_selection(selected)
+
+    key = answer_keys.get(qid)
+    if not key: return {"error": "Question not found"}, 404
+    if key.qid not in state.seen:
+        return {"error": "Question was not served in this attempt"}, 409
+    # One answer per serve: replays and repeated ids in a batch don't score again
+    if not state.take_pending(key.qid):
+        return {"error": "Question was already answered"}, 409
+
+    correct = is_correct(key, sel_list)
+
+    # Mode Adjustments (e.g. Adaptive)
+    points, adj = mode.score(attempt, key, correct, time_used)
+    adj = adj or {}
+
+    # Update Attempt
+    attempt.score = (attempt.score or 0) + points
+    if adj.get("next_diff"):
+        state.current_diff = adj["next_diff"]
+    if "ability" in adj:
+        state.ability, state.ability_se = adj["ability"], adj["ability_se"]
+
+    # Log
+    attempt.add_event(key.qid, correct, time_used=time_used,
+                      difficulty=key.difficulty, selected=sel_list, defer=defer)
+    attempt.ended_at = datetime.utcnow()
+
+    finished = bool(mode.finished(attempt, state))
+    if finished:
+        if defer:
+            attempt.closed_at = attempt.ended_at
+        else:
+            attempt.close()
+
+    return {
+        "question_id": key.qid,
+        "correct": correct,
+        "finished": finished,
+        "attempt_score": attempt.score,
+        "adjustment": adj,
+        "correct_answers": list(key.raw)
+    }, 200
+
+def save_answers(attempt, mode, state, answers):
+    """
+    Score `answers` (request dicts) in order and persist them in one
+    transaction, or as one write-behind batch when WRITE_BEHIND is on.
+    Returns ([(result, status)], attempt_score), or None when the
+    write-behind queue is full and nothing was recorded.
+    """
+    def score(a, defer=False):
+        if not isinstance(a, dict):
+            return {"error": "Invalid answer"}, 400
+        return score_answer(attempt, mode, state, a.get("question_id"),
+                            a.get("selected"), a.get("time_used"), defer=defer)
+
+    wb = write_behind()
+    if wb is None:
+        scored = [score(a) for a in answers]
+        db.session.commit()
+        return scored, attempt.score
+
+    # Score against the loaded rows only; nothing may reach the database here
+    base_score, base_diff = attempt.score or 0, state.current_diff
+    base_ability = (state.ability, state.ability_se)
+    with db.session.no_autoflush:
+        scored = [score(a, defer=True) for a in answers]
+    score_now = attempt.score
+    batch = AnswerBatch(
+        attempt_id=attempt.id,
+        events=attempt.deferred_events(),
+        points=(attempt.score or 0) - base_score,
+        current_diff=state.current_diff if state.current_diff != base_diff else None,
+        ability=(state.ability, state.ability_se)
+                if (state.ability, state.ability_se) != base_ability else None,
+        ended_at=attempt.ended_at,
+        closed_at=attempt.closed_at,
+    )
+    db.session.expunge_all()  # drop the in-memory changes; the flusher applies them
+    if batch.events and not wb.submit(batch):
+        return None
+    return scored, score_now
+
+def serve_next(attempt, mode, state):
+    """
+    Pick the attempt's next question and mark it seen, or close the attempt
+    if the mode has ended it. Returns the client payload; the caller commits.
+    """
+    message = mode.finished(attempt, state)
+    if attempt.closed_at:
+        return {"finished": True, "message": message or "Attempt already finished"}
+
+    # Check database status
+    if question_index.count() == 0:
+        message = "No questions"
+
+    if not message:
+        q = mode.next_question(attempt, state)
+        if q:
+            state.mark_seen(q.id)
+            return question_payload(q, state)
+        message = "All done"
+
+    attempt.close()
+    return {"finished": True, "message": message}
+
+def load_attempt_and_mode(data):
+    """Resolve (attempt, mode, state) from a request body, or an error response."""
+    attempt = load_own_attempt(data.get("attempt_id"))
+    if not attempt:
+        return None, (jsonify({"error": "Invalid attempt"}), 400)
+    mode = get_mode(attempt.mode)
+    if mode is None:
+        return None, (jsonify({"error": "Invalid mode"}), 400)
+    return (attempt, mode, attempt.get_state()), None
+
 # -------------------------------
 # API: GET QUESTION
 # -------------------------------
@@ -77,70 +249,56 @@ def start_attempt_api():
 @login_required
 def get_question_api():
     data = request.get_json() or {}
-    mode = (data.get("mode") or "adaptive").lower()
-    attempt_id = data.get("attempt_id")
-    state = data.get("state", {}) or {}
 
-    attempt = Attempt.query.get(attempt_id)
-    if not attempt:
-        return jsonify({"error": "Invalid attempt"}), 400
+    # Mode and progress come from the server, not the client
+    loaded, err = load_attempt_and_mode(data)
+    if err: return err
+    attempt, mode, state = loaded
 
-    # 1. First Strike Override
-    if mode == "firststrike":
-        try:
-            from quiz.modes.firststrike import get_question as fs_get
-            return jsonify(fs_get(attempt))
-        except ImportError:
-            return jsonify({"error": "Mode module missing"}), 500
+    payload = serve_next(attempt, mode, state)
+    db.session.commit()
 
-    # 2. Standard Logic (Stateless)
-    try:
-        current_diff = int(state.get("current_diff", 3))
-    except: current_diff = 3
-    
-    seen = []
-    for x in (state.get("seen_qids") or []):
-        try: seen.append(int(x))
-        except: pass
+    return jsonify(payload)
+
+# -------------------------------
+# API: PREFETCH BUNDLE (Minute Rush, Level Infinity)
+# -------------------------------
+@quiz_bp.route("/api/get_questions", methods=["POST"])
+@login_required
+def get_questions_api():
+    data = request.get_json() or {}
+
+    loaded, err = load_attempt_and_mode(data)
+    if err: return err
+    attempt, mode, state = loaded
+    if not mode.prefetch:
+        return jsonify({"error": "Prefetch not supported for this mode"}), 400
+    if attempt.closed_at:
+        return jsonify({"questions": [], "finished": True, "state": state.to_dict()})
 
-    # Check database status
-    total = Question.query.count()
-    if total == 0: return jsonify({"finished": True, "message": "No questions"})
-    
-    # --- FIX: Skip completion check for levelinfinity ---
-    if mode != "levelinfinity":
-        if len(seen) >= total:
-            return jsonify({"finished": True, "message": "All done"})
-
-    # Dispatcher
-    q = None
     try:
-        mod = importlib.import_module(f"quiz.modes.{mode}")
-        if hasattr(mod, "get_question"):
-            q = mod.get_question(current_diff, seen)
-    except:
-        pass # Fallback
-
-    # Fallback if specific mode failed
-    if not q:
-        # For Level Infinity, we should force a pick even if seen=total
-        if mode == "levelinfinity":
-             pool = Question.query.all()
-             if pool: q = random.choice(pool)
-        else:
-             pool = [x for x in Question.query.all() if x.id not in seen]
-             if pool: q = random.choice(pool)
+        count = int(data.get("count", PREFETCH_DEFAULT))
+    except (TypeError, ValueError):
+        count = PREFETCH_DEFAULT
+    count = max(1, min(PREFETCH_MAX, count))
 
-    if not q:
-        return jsonify({"finished": True})
+    # Each pick sees the ids marked before it, so the mode's own
+    # no-repeat / repeat-after-exhaustion rules hold within the bundle.
+    questions = []
+    for _ in range(count):
+        q = mode.next_question(attempt, state)
+        if not q:
+            break
+        state.mark_seen(q.id)
+        questions.append(q)
+    if not questions:
+        attempt.close()
+    db.session.commit()
 
     return jsonify({
-        "id": q.id,
-        "prompt": q.prompt,
-        "options": json.loads(q.options_json or "[]"),
-        "difficulty": q.difficulty,
-        "qtype": q.qtype,
-        "state": {"current_diff": current_diff, "seen_qids": seen}
+        "questions": [question_payload(q, state) for q in questions],
+        "finished": not questions,
+        "state": state.to_dict()
     })
 
 
@@ -151,93 +309,66 @@ def get_question_api():
 @login_required
 def submit_answer_api():
     data = request.get_json() or {}
-    attempt_id = data.get("attempt_id")
-    qid = data.get("question_id")
-    selected = data.get("selected")
-    mode = (data.get("mode") or "").lower()
-    time_used = data.get("time_used")
-
-    attempt = Attempt.query.get(attempt_id)
-    if not attempt: return jsonify({"error": "Invalid attempt"}), 400
-    
-    # Normalize Selection
-    sel_list = []
-    if isinstance(selected, list):
-        sel_list = [str(x).strip() for x in selected if x is not None]
-    elif selected is not None:
-        sel_list = [str(selected).strip()]
-
-    # 1. First Strike Override
-    if mode == "firststrike":
-        from quiz.modes.firststrike import submit_answer as fs_submit
-        res = fs_submit(attempt, qid, sel_list, time_used)
-        db.session.commit()
-        return jsonify(res)
-
-    # 2. Standard Scoring
-    q = Question.query.get(qid)
-    if not q: return jsonify({"error": "Question not found"}), 404
-
-    # Check Correctness (Simplified logic for brevity, robust enough for standard usage)
-    try: opts = json.loads(q.options_json or "[]")
-    except: opts = []
-    id_map = {str(o['id']): str(o.get('text','')).lower() for o in opts}
-    
-    raw = [str(x).strip() for x in (q.correct_answers or "").split(",") if x.strip()]
-    correct_set = set()
-    for r in raw:
-        if r in id_map: correct_set.add(id_map[r])
-        else: correct_set.add(r.lower())
-        
-    user_set = set()
-    for u in sel_list:
-        if u in id_map: user_set.add(id_map[u])
-        else: user_set.add(u.lower())
-        
-    correct = (user_set == correct_set)
 
-    # Mode Adjustments (e.g. Adaptive)
-    points = 1 if correct else 0
-    adj = {}
-    
-    if mode and mode != "firststrike":
-        try:
-            mod = importlib.import_module(f"quiz.modes.{mode}")
-            if hasattr(mod, "handle_result"):
-                res = mod.handle_result(attempt, q, correct, time_used)
-                if isinstance(res, tuple):
-                    points = res[0]
-                    if len(res) > 1: adj = res[1]
-        except: pass
+    loaded, err = load_attempt_and_mode(data)
+    if err: return err
+    attempt, mode, state = loaded
 
-    # Update Attempt
-    attempt.score = (attempt.score or 0) + points
-    
-    # Log
-    try: details = json.loads(attempt.details) if attempt.details else []
-    except: details = []
-    details.append({
-        "qid": qid, "selected": sel_list, "correct": correct,
-        "time_used": time_used, "difficulty": q.difficulty,
-        "timestamp": datetime.utcnow().isoformat()
-    })
-    attempt.details = json.dumps(details)
-    attempt.ended_at = datetime.utcnow()
+    saved = save_answers(attempt, mode, state, [data])
+    if saved is None:
+        return jsonify({"error": "Server busy, please resubmit"}), 503
+    result, status = saved[0][0]
+    return jsonify(result), status
+
+# -------------------------------
+# API: SUBMIT AND NEXT (one round trip per question)
+# -------------------------------
+@quiz_bp.route("/api/submit_and_next", methods=["POST"])
+@login_required
+def submit_and_next_api():
+    data = request.get_json() or {}
+
+    loaded, err = load_attempt_and_mode(data)
+    if err: return err
+    attempt, mode, state = loaded
+
+    # Scoring, the mode's adjustment and the next pick share one transaction.
+    # Picking writes the attempt state anyway, so this path never goes
+    # through the write-behind queue.
+    result, status = score_answer(attempt, mode, state, data.get("question_id"),
+                                  data.get("selected"), data.get("time_used"))
+    if status != 200:
+        return jsonify(result), status
+
+    result["next"] = None if result["finished"] else serve_next(attempt, mode, state)
     db.session.commit()
-    
-    # Adaptive Default
-    if not adj and mode == "adaptive":
-        adj = {
-            "next_diff": min(10, q.difficulty + 1) if correct else max(1, q.difficulty - 1),
-            "rule": "default"
-        }
+    return jsonify(result)
 
-    return jsonify({
-        "correct": correct,
-        "attempt_score": attempt.score,
-        "adjustment": adj,
-        "correct_answers": raw
-    })
+# -------------------------------
+# API: BATCH SUBMIT (Minute Rush, Level Infinity)
+# -------------------------------
+@quiz_bp.route("/api/submit_answers", methods=["POST"])
+@login_required
+def submit_answers_api():
+    data = request.get_json() or {}
+
+    loaded, err = load_attempt_and_mode(data)
+    if err: return err
+    attempt, mode, state = loaded
+    if not mode.prefetch:
+        return jsonify({"error": "Batch submit not supported for this mode"}), 400
+
+    answers = data.get("answers") or []
+    if not isinstance(answers, list) or len(answers) > PREFETCH_MAX * 2:
+        return jsonify({"error": "Invalid answers"}), 400
+
+    # All answers are scored in one transaction
+    saved = save_answers(attempt, mode, state, answers)
+    if saved is None:
+        return jsonify({"error": "Server busy, please resubmit"}), 503
+    scored, score = saved
+    return jsonify({"results": [result for result, _ in scored], "attempt_score": score,
+                    "state": state.to_dict()})
 
 # -------------------------------
 # API: END ATTEMPT
@@ -246,9 +377,9 @@ def submit_answer_api():
 @login_required
 def end_attempt_api():
     data = request.get_json() or {}
-    attempt = Attempt.query.get(data.get("attempt_id"))
+    attempt = load_own_attempt(data.get("attempt_id"))
     if attempt:
-        attempt.ended_at = datetime.utcnow()
+        attempt.close()
         db.session.commit()
         return jsonify({"ok": True, "attempt_id": attempt.id})
     return jsonify({"error": "Invalid"}), 400
@@ -259,8 +390,9 @@ def end_attempt_api():
 @quiz_bp.route("/results/<int:attempt_id>")
 @login_required
 def results(attempt_id):
-    a = Attempt.query.get_or_404(attempt_id)
-    
+    wait_for_attempt(attempt_id)  # answers still in the write-behind queue
+    a = Attempt.query.options(undefer(Attempt.summary)).get_or_404(attempt_id)
+
     # FIX: Robust check for role (handle Enum or String)
     user_role = getattr(current_user, "role", None)
     # If role is an Enum (e.g. Role.TEACHER), get its value, else use string
@@ -270,39 +402,55 @@ def results(attempt_id):
     if a.user_id != current_user.id and role_value != "teacher":
         abort(403)
         
-    try:
-        details = json.loads(a.details) if a.details else []
-        events = [d for d in details if d.get("qid")]
-    except: events = []
-
-    total = Question.query.count() if a.mode == "firststrike" else len(events)
-    correct_c = a.score or 0
-    pct = round((correct_c / total * 100), 1) if total else 0
-    
-    return render_template("results.html", attempt=a, details=events, 
-                           total_questions=total, percentage=pct, correct_count=correct_c)
+    summary = attempt_summary(a)
+    return render_template("results.html", attempt=a, details=summary["events"],
+                           total_questions=summary["total"], percentage=summary["percentage"],
+                           correct_count=summary["correct"], ability=summary["ability"])
 
 @quiz_bp.route("/my_attempts")
 @login_required
 def my_attempts():
-    attempts = Attempt.query.filter_by(user_id=current_user.id).order_by(Attempt.started_at.desc()).all()
-    return render_template("my_attempts.html", attempts=attempts)
+    page = page_from_request(Attempt.for_user(current_user.id, request.args.get("mode")),
+                             ATTEMPT_ORDER)
+    if wants_json():
+        return jsonify(page.to_dict(Attempt.to_dict))
+
+    total = (db.session.query(func.count(Attempt.id))
+             .filter(Attempt.user_id == current_user.id).scalar())
+    return render_template("my_attempts.html", attempts=page, total=total,
+                           modes=mode_names(), mode=request.args.get("mode"),
+                           sort=request.args.get("sort"))
 
 @quiz_bp.route("/profile")
 @login_required
 def profile():
-    attempts = Attempt.query.filter_by(user_id=current_user.id).order_by(Attempt.started_at.desc()).all()
-    scores = [a.score or 0 for a in attempts]
-    avg = sum(scores)/len(scores) if scores else 0
-    
-    stats = {}
-    for a in attempts:
-        m = a.mode or "unknown"
-        stats.setdefault(m, {"count":0, "total":0})
-        stats[m]["count"] += 1
-        stats[m]["total"] += (a.score or 0)
-        
-    return render_template("student_profile.html", attempts=attempts, 
-                           total_attempts=len(attempts), avg_score=avg, 
-                           best_score=max(scores) if scores else 0,
-                           mode_stats=stats, recent=attempts[:10])
\ No newline at end of file
+    # Maintained totals (one indexed lookup) plus the 10 latest attempts
+    stats = UserStats.for_user(current_user.id)
+    overall = stats.pop(UserStats.ALL_MODES, None)
+    mode_stats = {m: {"count": st.attempts, "total": st.score_sum}
+                  for m, st in sorted(stats.items())}
+
+    recent = keyset_page(Attempt.for_user(current_user.id), ATTEMPT_ORDER, per_page=10)
+    return render_template("student_profile.html",
+                           total_attempts=overall.attempts if overall else 0,
+                           avg_score=overall.avg if overall else 0,
+                           best_score=overall.best if overall else 0,
+                           mode_stats=mode_stats, recent=recent.items)
+
+@quiz_bp.route("/leaderboard")
+@login_required
+def leaderboard():
+    modes = leaderboard_modes()
+    mode = request.args.get("mode")
+    mode = mode if mode in modes else (modes[0] if modes else None)
+    period = request.args.get("period")
+    period = period if period in LeaderboardEntry.PERIODS else "week"
+
+    board = leaderboards.board(mode, period) if mode else None
+    me = leaderboards.my_rank(mode, period, current_user.id) if mode else None
+    if wants_json():
+        return jsonify({"mode": mode, "period": period,
+                        "top": board.top if board else [], "me": me})
+    return render_template("leaderboard.html", modes=modes, mode=mode, period=period,
+                           periods=LeaderboardEntry.PERIODS,
+                           top=board.top if board else [], me=me)
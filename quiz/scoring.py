@@ -0,0 +1,80 @@
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+from extensions import db
+from models import Question
+from .modes.common import question_index
+
+# Compiled, immutable answer key for one question.
+#   option_text: option id -> lowercased option text
+#   correct:     frozenset of normalized correct answers
+#   raw:         correct answers as the teacher entered them (shown on wrong answers)
+AnswerKey = namedtuple("AnswerKey", "qid difficulty option_text correct raw")
+
+
+def compile_key(q):
+    """Normalize a Question into an AnswerKey. The only place options are parsed for scoring."""
+    try:
+        opts = json.loads(q.options_json or "[]")
+    except Exception:
+        opts = []
+    option_text = {str(o.get("id")): str(o.get("text", "")).lower() for o in opts}
+
+    raw = tuple(str(x).strip() for x in (q.correct_answers or "").split(",") if x.strip())
+    correct = frozenset(option_text.get(r, r.lower()) for r in raw)
+
+    return AnswerKey(q.id, q.difficulty, MappingProxyType(option_text), correct, raw)
+
+
+def is_correct(key, selected):
+    """Compare a normalized selection (list of strings) against the key."""
+    chosen = frozenset(key.option_text.get(s, s.lower()) for s in selected)
+    return chosen == key.correct
+
+
+class AnswerKeyCache:
+    """
+    LRU of compiled answer keys, keyed by question id plus the question bank
+    revision, so a teacher edit anywhere makes stale keys unreachable.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._keys = OrderedDict()
+
+    def get(self, qid):
+        try:
+            qid = int(qid)
+        except (TypeError, ValueError):
+            return None
+        cache_key = (qid, question_index.revision())
+
+        with self._lock:
+            key = self._keys.get(cache_key)
+            if key is not None:
+                self._keys.move_to_end(cache_key)
+                return key
+
+        q = db.session.get(Question, qid)
+        if q is None:
+            return None
+        key = compile_key(q)
+
+        with self._lock:
+            self._keys[cache_key] = key
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+        return key
+
+    def invalidate(self, qid=None):
+        with self._lock:
+            if qid is None:
+                self._keys.clear()
+            else:
+                for k in [k for k in self._keys if k[0] == qid]:
+                    del self._keys[k]
+
+
+answer_keys = AnswerKeyCache()
@@ -0,0 +1,85 @@
+import json
+
+from sqlalchemy.orm import load_only
+
+from extensions import db
+from models import Question
+from .modes.common import question_index
+from .modes.irt import logit_to_level
+
+# Bump when the snapshot layout changes; older snapshots are rebuilt on view
+SUMMARY_VERSION = 2
+
+
+def _options(q):
+    try:
+        return {str(o.get("id")): str(o.get("text", "")) for o in json.loads(q.options_json or "[]")}
+    except Exception:
+        return {}
+
+
+def build_summary(attempt):
+    """
+    Totals and per-answer rows for the results page. Every question the
+    attempt touched is loaded in one query, for its prompt and option texts.
+    """
+    events = [ev.to_dict() for ev in attempt.events]
+    qids = {ev["qid"] for ev in events}
+    questions = {}
+    if qids:
+        rows = (Question.query.filter(Question.id.in_(qids))
+                .options(load_only(Question.id, Question.prompt, Question.options_json,
+                                   Question.correct_answers)))
+        questions = {q.id: q for q in rows}
+
+    rows = []
+    for ev in events:
+        q = questions.get(ev["qid"])
+        options = _options(q) if q else {}
+        correct_ids = [c.strip() for c in (q.correct_answers or "").split(",") if c.strip()] if q else []
+        rows.append(dict(
+            ev,
+            prompt=q.prompt if q else None,   # None: deleted since
+            selected_text=[options.get(str(s), str(s)) for s in ev["selected"]],
+            correct_text=[options.get(c, c) for c in correct_ids],
+        ))
+
+    # First Strike is scored against the whole bank (frozen with the snapshot)
+    total = question_index.count() if attempt.mode == "firststrike" else len(rows)
+    correct = attempt.score or 0
+
+    # Adaptive mode's final ability estimate (logits, with its standard error)
+    ability = None
+    state = attempt.state
+    if state is not None and state.ability is not None:
+        ability = {"theta": round(state.ability, 2), "se": round(state.ability_se or 0, 2),
+                   "level": logit_to_level(state.ability)}
+
+    return {
+        "version": SUMMARY_VERSION,
+        "total": total,
+        "correct": correct,
+        "percentage": round(correct / total * 100, 1) if total else 0,
+        "ability": ability,
+        "events": rows,
+    }
+
+
+def attempt_summary(attempt):
+    """
+    The results summary. Once the attempt is closed it can't change, so the
+    first view stores it on the attempt and later views just read it back.
+    """
+    if attempt.summary:
+        try:
+            summary = json.loads(attempt.summary)
+            if summary.get("version") == SUMMARY_VERSION:
+                return summary
+        except ValueError:
+            pass
+
+    summary = build_summary(attempt)
+    if attempt.closed_at:
+        attempt.summary = json.dumps(summary, ensure_ascii=False)
+        db.session.commit()
+    return summary
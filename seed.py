@@ -5,6 +5,7 @@
 import os
 from app import create_app
 from extensions import db
+from migrations import upgrade_schema
 from models import User, Role
 
 # If you want to force recreate DB file during dev, set RECREATE_DB = True
@@ -24,8 +25,8 @@ with app.app_context():
         except Exception as e:
             print("Could not remove DB file:", e)
 
-    # Ensure tables exist
-    db.create_all()
+    # Ensure tables exist and are at the latest schema version
+    upgrade_schema()
 
     # Remove any pre-existing teacher user so seeding is deterministic
     existing = User.query.filter_by(username="teacher").first()
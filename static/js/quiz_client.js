@@ -4,7 +4,7 @@
 let ANSWER_LOCKED = false;
 let MODE = null;
 let ATTEMPT_ID = null;
-let STATE = { current_diff: 3, seen_qids: [] };
+let STATE = { current_diff: 3 }; // server owns progress; this mirrors current_diff for timers
 let CURRENT_Q = null;
 let TIME_LEFT = null; // null means no per-question countdown (used by adaptive/minuterush)
 let TIMER_INT = null;
@@ -13,6 +13,20 @@ let ELAPSE_INT = null; // interval for elapsed timer in adaptive
 let SCORE = 0;
 let QUESTION_START_TS = null; // milliseconds epoch when question was shown
 
+// Prefetch modes keep a small local queue of questions and submit answers in
+// batches, so the student never waits on a round trip between questions.
+const PREFETCH_MODES = ["minuterush", "levelinfinity"];
+const PREFETCH_SIZE = 5; // questions per bundle
+const PREFETCH_LOW_WATER = 2; // refill when the local queue drops below this
+const SUBMIT_BATCH_SIZE = 3; // answers per batch submit
+const SUBMIT_FLUSH_MS = 1500; // flush a partial batch after this long
+let Q_QUEUE = [];
+let Q_EXHAUSTED = false;
+let REFILL_PROMISE = null;
+let PENDING_ANSWERS = [];
+let FLUSH_TIMER = null;
+let FLUSH_PROMISE = Promise.resolve();
+
 ///////////// Helpers /////////////
 const qs = (id) => document.getElementById(id);
 const safeJson = async (res) => {
@@ -24,6 +38,7 @@ const safeJson = async (res) => {
   }
 };
 const nowMs = () => Date.now();
+const usesPrefetch = () => PREFETCH_MODES.includes(MODE);
 
 ///////////// Sidebar helpers (Flexbox compatible) /////////////
 function hideSidebar() {
@@ -326,93 +341,178 @@ function nextQuestion(lastOutcome) {
     return;
   }
 
+  // the server tracks difficulty and seen questions for the attempt
   const body = {
-    mode: MODE,
     attempt_id: ATTEMPT_ID,
     last_outcome: lastOutcome,
-    state: STATE,
   };
 
-  fetchJson("/quiz/api/get_question", body)
-    .then((data) => {
-      // server error
-      if (data?.error) {
-        flashMessage(data.error || "No questions available", "red");
-        setTimeout(finishRun, 1500);
-        return;
-      }
+  const next = usesPrefetch()
+    ? takeQueuedQuestion()
+    : fetchJson("/quiz/api/get_question", body);
 
-      // server signalled finished (no unseen questions)
-      if (data?.finished) {
-        ANSWER_LOCKED = true;
+  next
+    .then(showNextQuestion)
+    .catch((err) => {
+      console.error("nextQuestion error:", err);
+      flashMessage("Problem fetching question.", "red");
+      showSidebar();
+      setTimeout(finishRun, 1500);
+    });
+}
 
-        const opts = qs("options");
-        if (opts) {
-          opts.innerHTML = `<div class="text-center text-slate-400 col-span-2">Finishing run...</div>`;
-        }
+// Render a question payload from get_question, the prefetch queue or
+// submit_and_next, or wrap up if the server says the run is over.
+function showNextQuestion(data) {
+  // server error
+  if (data?.error) {
+    flashMessage(data.error || "No questions available", "red");
+    setTimeout(finishRun, 1500);
+    return;
+  }
 
-        flashMessage("All questions completed!", "green");
-        showSidebar();
-        setTimeout(finishRun, 600);
-        return;
-      }
+  // server signalled finished (no unseen questions)
+  if (data?.finished) {
+    ANSWER_LOCKED = true;
 
-      // got a normal question
-      CURRENT_Q = data;
-
-      // merge server state safely (coerce seen ids to ints)
-      if (data.state) {
-        STATE.current_diff =
-          typeof data.state.current_diff !== "undefined"
-            ? data.state.current_diff
-            : STATE.current_diff;
-        if (Array.isArray(data.state.seen_qids)) {
-          STATE.seen_qids = data.state.seen_qids
-            .map((x) => {
-              try {
-                return parseInt(x);
-              } catch (e) {
-                return x;
-              }
-            })
-            .filter((x) => x !== null && typeof x !== "undefined");
-        }
-      }
+    const opts = qs("options");
+    if (opts) {
+      opts.innerHTML = `<div class="text-center text-slate-400 col-span-2">Finishing run...</div>`;
+    }
 
-      // push current q id to seen to avoid repetition
-      if (CURRENT_Q?.id) {
-        const qidNum = parseInt(CURRENT_Q.id);
-        if (!STATE.seen_qids.includes(qidNum)) STATE.seen_qids.push(qidNum);
-      }
+    flashMessage("All questions completed!", "green");
+    showSidebar();
+    setTimeout(finishRun, 600);
+    return;
+  }
 
-      renderQuestion(data);
+  // got a normal question
+  CURRENT_Q = data;
 
-      // --- Timer Logic per Mode ---
+  // mirror the server's difficulty (used by the challenger timer)
+  if (data.state && typeof data.state.current_diff !== "undefined") {
+    STATE.current_diff = data.state.current_diff;
+  }
 
-      if (MODE === "minuterush") {
-        // Global timer handles the end condition. No per-question timer.
-        TIME_LEFT = null;
-        // Ensure label is correct
-        if (qs("timeLabel")) qs("timeLabel").innerText = "Total Time:";
-      } else if (MODE === "challenger") {
-        TIME_LEFT = Math.max(8, 20 - STATE.current_diff);
-        startTimer();
-      } else if (MODE === "firststrike") {
-        TIME_LEFT = null;
-        if (qs("timeLeft")) qs("timeLeft").innerText = "--";
-        if (qs("timeLabel")) qs("timeLabel").innerText = "Sudden Death";
-      } else {
-        // Adaptive: elapsed time counting up
-        TIME_LEFT = null;
-        startElapsedTimer();
-      }
+  renderQuestion(data);
+
+  // --- Timer Logic per Mode ---
+
+  if (MODE === "minuterush") {
+    // Global timer handles the end condition. No per-question timer.
+    TIME_LEFT = null;
+    // Ensure label is correct
+    if (qs("timeLabel")) qs("timeLabel").innerText = "Total Time:";
+  } else if (MODE === "challenger") {
+    TIME_LEFT = Math.max(8, 20 - STATE.current_diff);
+    startTimer();
+  } else if (MODE === "firststrike") {
+    TIME_LEFT = null;
+    if (qs("timeLeft")) qs("timeLeft").innerText = "--";
+    if (qs("timeLabel")) qs("timeLabel").innerText = "Sudden Death";
+  } else {
+    // Adaptive: elapsed time counting up
+    TIME_LEFT = null;
+    startElapsedTimer();
+  }
+}
+
+///////////// Prefetch queue (minuterush / levelinfinity) /////////////
+function refillQueue() {
+  if (REFILL_PROMISE) return REFILL_PROMISE;
+  if (Q_EXHAUSTED) return Promise.resolve();
+
+  REFILL_PROMISE = fetchJson("/quiz/api/get_questions", {
+    attempt_id: ATTEMPT_ID,
+    count: PREFETCH_SIZE,
+  })
+    .then((data) => {
+      if (data?.error) throw new Error(data.error);
+      Q_QUEUE.push(...(data.questions || []));
+      if (data.finished) Q_EXHAUSTED = true;
     })
-    .catch((err) => {
-      console.error("nextQuestion error:", err);
-      flashMessage("Problem fetching question.", "red");
-      showSidebar();
-      setTimeout(finishRun, 1500);
+    .finally(() => {
+      REFILL_PROMISE = null;
     });
+  return REFILL_PROMISE;
+}
+
+async function takeQueuedQuestion() {
+  if (!Q_QUEUE.length) await refillQueue();
+  const q = Q_QUEUE.shift();
+
+  // keep the queue topped up in the background
+  if (Q_QUEUE.length < PREFETCH_LOW_WATER) {
+    refillQueue().catch((err) => console.error("refillQueue error:", err));
+  }
+  return q || { finished: true };
+}
+
+function queueAnswer(answer) {
+  PENDING_ANSWERS.push(answer);
+  if (PENDING_ANSWERS.length >= SUBMIT_BATCH_SIZE) flushAnswers();
+  else if (!FLUSH_TIMER) FLUSH_TIMER = setTimeout(flushAnswers, SUBMIT_FLUSH_MS);
+}
+
+function flushAnswers() {
+  if (FLUSH_TIMER) {
+    clearTimeout(FLUSH_TIMER);
+    FLUSH_TIMER = null;
+  }
+  if (!PENDING_ANSWERS.length) return FLUSH_PROMISE;
+
+  const batch = PENDING_ANSWERS.splice(0);
+  // chain batches so they reach the server in answer order
+  FLUSH_PROMISE = FLUSH_PROMISE.then(() =>
+    fetchJson("/quiz/api/submit_answers", {
+      attempt_id: ATTEMPT_ID,
+      answers: batch,
+    })
+      .then((resp) => {
+        if (resp?.error) {
+          flashMessage(resp.error, "red");
+          return;
+        }
+        // the server's score and state are authoritative, rejected answers included
+        SCORE = resp.attempt_score ?? SCORE;
+        if (qs("score")) qs("score").innerText = SCORE;
+        if (resp.state && typeof resp.state.current_diff !== "undefined") {
+          STATE.current_diff = resp.state.current_diff;
+        }
+
+        const rejected = (resp.results || []).filter((r) => !r || r.error);
+        if (rejected.length) {
+          console.warn("answers not recorded:", rejected);
+          flashMessage(
+            `${rejected.length} answer${rejected.length > 1 ? "s" : ""} not recorded: ` +
+              (rejected[0]?.error || "unknown error"),
+            "red"
+          );
+        }
+
+        const results = (resp.results || []).filter((r) => r && !r.error);
+        const wrong = results.filter((r) => !r.correct);
+        if (!results.length) return;
+        if (!wrong.length) {
+          flashMessage(
+            results.length > 1 ? `${results.length} correct!` : "Correct!",
+            "green"
+          );
+        } else {
+          const last = wrong[wrong.length - 1];
+          flashMessage(
+            `${wrong.length} wrong. Last correct: ` +
+              (last.correct_answers || []).join(", "),
+            "red"
+          );
+        }
+      })
+      .catch((err) => {
+        console.error("flushAnswers error:", err);
+        flashMessage("Network or server error.", "red");
+      })
+  );
+  return FLUSH_PROMISE;
 }
 
 function renderQuestion(q) {
@@ -572,12 +672,22 @@ function submitAnswer(selected) {
     attempt_id: ATTEMPT_ID,
     question_id: CURRENT_Q.id,
     selected: selected,
-    mode: MODE,
     time_used: time_used,
-    state: STATE,
   };
 
-  fetchJson("/quiz/api/submit_answer", body)
+  // prefetch modes: score in the background, move straight on
+  if (usesPrefetch()) {
+    queueAnswer({
+      question_id: body.question_id,
+      selected: body.selected,
+      time_used: body.time_used,
+    });
+    setTimeout(() => nextQuestion(null), 150);
+    return;
+  }
+
+  // one round trip: the response carries the next question too
+  fetchJson("/quiz/api/submit_and_next", body)
     .then((resp) => {
       if (resp?.error) {
         flashMessage(resp.error || "Error submitting answer", "red");
@@ -596,9 +706,9 @@ function submitAnswer(selected) {
           "red"
         );
 
-      // mode-specific termination: firststrike or challenger may end on wrong
-      // IMPORTANT: In firststrike, server usually sets 'finished' to true on wrong answer
-      if ((MODE === "firststrike" || MODE === "challenger") && !correct) {
+      // mode-specific termination: the server reports 'finished' (firststrike
+      // game over); challenger also ends on a wrong answer
+      if (resp.finished || (MODE === "challenger" && !correct)) {
         // show sidebar then finish
         showSidebar();
         finishRun();
@@ -609,13 +719,10 @@ function submitAnswer(selected) {
       if (resp.adjustment?.next_diff)
         STATE.current_diff = resp.adjustment.next_diff;
 
-      // small delay for feedback then next question
+      // small delay for feedback then the question that came with it
       setTimeout(() => {
-        nextQuestion({
-          correct,
-          qid: CURRENT_Q.id,
-          difficulty: CURRENT_Q.difficulty,
-        });
+        stopPerQuestionTimers();
+        showNextQuestion(resp.next);
       }, 450);
     })
     .catch((err) => {
@@ -685,7 +792,9 @@ function finishRun() {
     return;
   }
 
-  fetchJson("/quiz/api/end_attempt", { attempt_id: ATTEMPT_ID })
+  // make sure batched answers are stored before closing the attempt
+  flushAnswers()
+    .then(() => fetchJson("/quiz/api/end_attempt", { attempt_id: ATTEMPT_ID }))
     .then((data) => {
       if (data?.ok) {
         window.location.href = "/quiz/results/" + data.attempt_id;
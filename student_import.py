@@ -0,0 +1,97 @@
+# student_import.py
+# Bulk student enrollment: one batched username lookup per chunk, password
+# hashing spread over a process pool, then a bulk insert.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import User, Role
+
+LOOKUP_CHUNK = 500          # usernames per IN (...) query
+POOL_THRESHOLD = 16         # below this, hashing serially is cheaper than a pool
+
+
+class StudentImportReport:
+    def __init__(self):
+        self.added = 0
+        self.skipped = 0    # username already exists (or repeats in the file)
+        self.invalid = 0    # missing username or password
+
+
+def hash_passwords(passwords, workers=None, progress=None):
+    """
+    Hash passwords with Werkzeug's generate_password_hash, in parallel across
+    processes. `progress(done, total)` is called as results come in.
+    """
+    passwords = list(passwords)
+    total = len(passwords)
+    if total < POOL_THRESHOLD or workers == 1:
+        hashes = []
+        for pw in passwords:
+            hashes.append(generate_password_hash(pw))
+            if progress:
+                progress(len(hashes), total)
+        return hashes
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, total // (workers * 4))
+    hashes = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for h in pool.map(generate_password_hash, passwords, chunksize=chunksize):
+            hashes.append(h)
+            if progress and (len(hashes) % 100 == 0 or len(hashes) == total):
+                progress(len(hashes), total)
+    return hashes
+
+
+def existing_usernames(usernames):
+    found = set()
+    usernames = list(usernames)
+    for i in range(0, len(usernames), LOOKUP_CHUNK):
+        chunk = usernames[i:i + LOOKUP_CHUNK]
+        found.update(u for (u,) in db.session.query(User.username)
+                     .filter(User.username.in_(chunk)))
+    return found
+
+
+def import_students(rows, workers=None, progress=None):
+    """
+    Enroll students from an iterable of (line number, cells) with a header
+    row first; columns are Username, Password. The caller commits.
+    """
+    report = StudentImportReport()
+    wanted = {}   # username -> password, first occurrence wins
+
+    for lineno, row in rows:
+        if lineno == 1:
+            continue  # skip header
+        if not row or not any(v not in (None, "") for v in row):
+            continue  # blank line
+        r = list(row) + [None] * 2
+        uname = str(r[0]).strip() if r[0] else None
+        pwd = str(r[1]).strip() if r[1] else None
+
+        if not uname or not pwd:
+            report.invalid += 1
+            continue
+        if uname in wanted:
+            report.skipped += 1
+            continue
+        wanted[uname] = pwd
+
+    taken = existing_usernames(wanted)
+    report.skipped += len(taken)
+    new = [(u, p) for u, p in wanted.items() if u not in taken]
+    if not new:
+        return report
+
+    hashes = hash_passwords([p for _, p in new], workers=workers, progress=progress)
+    db.session.bulk_insert_mappings(User, [
+        {"username": u, "password_hash": h, "role": Role.STUDENT}
+        for (u, _), h in zip(new, hashes)
+    ])
+    report.added = len(new)
+    return report
@@ -1,13 +1,18 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from extensions import db
-from models import Question, User, Role, Attempt
+from models import Question, User, Role, Attempt, AttemptEvent, QuestionStats, UserStats, LeaderboardEntry, ItemCalibration, ATTEMPT_ORDER
+from quiz.modes import mode_names
+from quiz.modes.common import question_index, bump_bank_revision
+from quiz.scoring import answer_keys
+from question_import import import_questions, iter_sheet_rows
+from student_import import import_students
+from export import FORMATS, KINDS, export_filename, export_stream
+from pagination import keyset_page, page_from_request, wants_json
 import json
+from datetime import datetime
 from functools import wraps
 from sqlalchemy import func
-import collections
-import csv
-import io
 
 teacher_bp = Blueprint("teacher", __name__)
 
@@ -23,6 +28,23 @@ def teacher_required(func):
     return wrapper
 
 
+def forget_attempts(query):
+    """Take the answers of the attempts matched by `query` out of QuestionStats."""
+    ids = query.with_entities(Attempt.id)
+    QuestionStats.forget(AttemptEvent.query.filter(AttemptEvent.attempt_id.in_(ids)))
+
+
+def delete_attempts(query):
+    """Bulk delete the attempts matched by `query`; events and state cascade."""
+    user_ids = [uid for (uid,) in query.with_entities(Attempt.user_id).distinct()]
+    forget_attempts(query)
+    deleted = query.delete(synchronize_session=False)
+    # Best scores can't be subtracted out, so recount the affected students
+    UserStats.rebuild(user_ids)
+    LeaderboardEntry.rebuild(user_ids)
+    return deleted
+
+
 # --- DASHBOARD ---
 @teacher_bp.route("/dashboard")
 @login_required
@@ -31,33 +53,35 @@ def dashboard():
     """
     Teacher dashboard: shows counts, students table, average scores.
     """
-    qcount = Question.query.count()
-    ucount = User.query.count()
-    
-    # List students
-    students = User.query.filter(User.role == Role.STUDENT).order_by(User.id.desc()).all()
-    
-    # Prepare attempts per student (id -> list of Attempt)
-    attempts = Attempt.query.all()
-    s_attempts = {}
-    for a in attempts:
-        s_attempts.setdefault(a.user_id, []).append(a)
-        
-    # Compute average score per student (None or float)
-    s_avg = {}
-    for s in students:
-        al = s_attempts.get(s.id, [])
-        if not al:
-            s_avg[s.id] = None
-        else:
-            total = sum((a.score or 0) for a in al)
-            s_avg[s.id] = total / len(al)
-            
+    qcount = question_index.count()
+    scount = (db.session.query(func.count(User.id))
+              .filter(User.role == Role.STUDENT).scalar())
+
+    # One page of students, newest first; search narrows it server-side
+    search = (request.args.get("q") or "").strip()
+    students_q = User.query.filter(User.role == Role.STUDENT)
+    if search:
+        students_q = students_q.filter(
+            func.lower(User.username).contains(search.lower(), autoescape=True))
+    students = page_from_request(students_q, User.id)
+
+    # Average score and attempt count for this page only, from UserStats
+    s_avg, s_count = {}, {}
+    ids = [s.id for s in students]
+    if ids:
+        rows = UserStats.query.filter(UserStats.user_id.in_(ids),
+                                      UserStats.mode == UserStats.ALL_MODES)
+        for st in rows:
+            s_avg[st.user_id] = st.avg
+            s_count[st.user_id] = st.attempts
+
     return render_template("dashboard.html",
                            qcount=qcount,
-                           ucount=ucount,
+                           scount=scount,
                            students=students,
-                           s_avg=s_avg)
+                           s_avg=s_avg,
+                           s_count=s_count,
+                           search=search)
 
 
 # --- QUESTIONS MANAGEMENT ---
@@ -65,8 +89,20 @@ def dashboard():
 @login_required
 @teacher_required
 def questions():
-    qs = Question.query.order_by(Question.created_at.desc()).all()
-    return render_template("teacher_questions.html", questions=qs)
+    qs = Question.query
+    difficulty = request.args.get("difficulty", type=int)
+    if difficulty:
+        qs = qs.filter(Question.difficulty == difficulty)
+    search = (request.args.get("q") or "").strip()
+    if search:
+        qs = qs.filter(func.lower(Question.prompt).contains(search.lower(), autoescape=True))
+
+    # Ids follow creation order, and (difficulty, id) is indexed
+    page = page_from_request(qs, Question.id)
+    if wants_json():
+        return jsonify(page.to_dict(Question.to_dict))
+    return render_template("teacher_questions.html", questions=page, search=search,
+                           difficulty=difficulty, sort=request.args.get("sort"))
 
 
 @teacher_bp.route("/questions/add", methods=["POST"])
@@ -106,7 +142,9 @@ def add_question():
         difficulty=diff
     )
     db.session.add(q)
+    rev = bump_bank_revision()
     db.session.commit()
+    question_index.add(q.id, q.difficulty, rev)
 
     flash("Question added!", "success")
     return redirect(url_for("teacher.questions"))
@@ -145,7 +183,10 @@ def edit_question(qid):
         q.difficulty = diff_i
         q.qtype = qtype
 
+        rev = bump_bank_revision()
         db.session.commit()
+        question_index.update(q.id, q.difficulty, rev)
+        answer_keys.invalidate(q.id)
         flash("Question updated!", "success")
         return redirect(url_for("teacher.questions"))
 
@@ -167,7 +208,10 @@ def edit_question(qid):
 def delete_question(qid):
     q = Question.query.get_or_404(qid)
     db.session.delete(q)
+    rev = bump_bank_revision()
     db.session.commit()
+    question_index.discard(qid, rev)
+    answer_keys.invalidate(qid)
     flash("Question deleted.", "success")
     return redirect(url_for("teacher.questions"))
 
@@ -189,7 +233,10 @@ def mass_delete():
             db.session.delete(q)
             deleted += 1
 
+    bump_bank_revision()
     db.session.commit()
+    question_index.invalidate()
+    answer_keys.invalidate()
     flash(f"Deleted {deleted} questions.", "success")
     return redirect(url_for("teacher.questions"))
 
@@ -208,73 +255,25 @@ def upload_excel():
         flash("Only .xlsx or .csv files supported.", "danger")
         return redirect(url_for("teacher.questions"))
 
-    rows = []
-    
     try:
-        # --- Handle XLSX ---
-        if filename.endswith(".xlsx"):
-            try:
-                import openpyxl
-            except ImportError:
-                flash("openpyxl module missing. Please install it or use CSV.", "danger")
-                return redirect(url_for("teacher.questions"))
-                
-            wb = openpyxl.load_workbook(file)
-            sheet = wb.active
-            rows = sheet.iter_rows(values_only=True)
-            
-        # --- Handle CSV ---
-        elif filename.endswith(".csv"):
-            # Read file stream as text
-            stream = io.StringIO(file.stream.read().decode("utf-8-sig", errors="replace"), newline=None)
-            csv_reader = csv.reader(stream)
-            rows = list(csv_reader)
-
-        added, updated = 0, 0
-
-        for i, row in enumerate(rows, start=1):
-            if i == 1: continue # skip header
-
-            # Unpack row safely (ensure at least 7 items)
-            row_list = list(row) + [None] * 7
-            qtxt, op1, op2, op3, op4, correct, difficulty = row_list[:7]
-
-            if not qtxt or not op1 or not op2 or not correct:
-                continue
-
-            try:
-                diff_i = int(difficulty) if difficulty is not None else 1
-            except:
-                diff_i = 1
-            diff_i = max(1, min(10, diff_i))
-
-            options = []
-            for idx, val in enumerate([op1, op2, op3, op4], start=1):
-                if val:
-                    options.append({"id": str(idx), "text": str(val)})
-
-            q = Question.query.filter_by(prompt=str(qtxt)).first()
-
-            if q:
-                q.options_json = json.dumps(options, ensure_ascii=False)
-                q.correct_answers = str(correct)
-                q.difficulty = diff_i
-                updated += 1
-            else:
-                new_q = Question(
-                    prompt=str(qtxt),
-                    options_json=json.dumps(options, ensure_ascii=False),
-                    correct_answers=str(correct),
-                    qtype="single",
-                    difficulty=diff_i
-                )
-                db.session.add(new_q)
-                added += 1
-
+        report = import_questions(iter_sheet_rows(file.stream, filename))
+        bump_bank_revision()
         db.session.commit()
-        flash(f"Upload complete! Added: {added} · Updated: {updated}", "success")
+        question_index.invalidate()
+        answer_keys.invalidate()
 
+        msg = f"Upload complete! Added: {report.added} · Updated: {report.updated}"
+        if report.skipped:
+            shown = "; ".join(f"row {n}: {reason}" for n, reason in report.skipped[:5])
+            more = f" (+{len(report.skipped) - 5} more)" if len(report.skipped) > 5 else ""
+            msg += f" · Skipped: {len(report.skipped)} ({shown}{more})"
+        flash(msg, "success")
+
+    except ImportError:
+        db.session.rollback()
+        flash("openpyxl module missing. Please install it or use CSV.", "danger")
     except Exception as e:
+        db.session.rollback()
         flash(f"Import failed: {str(e)}", "danger")
 
     return redirect(url_for("teacher.questions"))
@@ -318,53 +317,21 @@ def upload_students_excel():
         flash("Only .xlsx or .csv files supported.", "danger")
         return redirect(url_for("teacher.dashboard"))
 
-    rows = []
-    
-    try:
-        # --- Handle XLSX ---
-        if filename.endswith(".xlsx"):
-            try:
-                import openpyxl
-            except ImportError:
-                flash("openpyxl module missing.", "danger")
-                return redirect(url_for("teacher.dashboard"))
-            
-            wb = openpyxl.load_workbook(file)
-            sheet = wb.active
-            rows = sheet.iter_rows(values_only=True)
-
-        # --- Handle CSV ---
-        elif filename.endswith(".csv"):
-            stream = io.StringIO(file.stream.read().decode("utf-8-sig", errors="replace"), newline=None)
-            csv_reader = csv.reader(stream)
-            rows = list(csv_reader)
-
-        added, skipped = 0, 0
-
-        # Expects: Username, Password
-        for i, row in enumerate(rows, start=1):
-            if i == 1: continue # skip header
-
-            r = list(row) + [None] * 2
-            uname = str(r[0]).strip() if r[0] else None
-            pwd = str(r[1]).strip() if r[1] else None
-
-            if not uname or not pwd:
-                continue
-
-            if User.query.filter_by(username=uname).first():
-                skipped += 1
-                continue
-
-            s = User(username=uname, role=Role.STUDENT)
-            s.set_password(pwd)
-            db.session.add(s)
-            added += 1
+    def progress(done, total):
+        current_app.logger.info(f"Student import: hashed {done}/{total} passwords")
 
+    # Expects: Username, Password
+    try:
+        report = import_students(iter_sheet_rows(file.stream, filename), progress=progress)
         db.session.commit()
-        flash(f"Import results: {added} new students recruited, {skipped} duplicates skipped.", "success")
+        flash(f"Import results: {report.added} new students recruited, "
+              f"{report.skipped} duplicates skipped, {report.invalid} invalid rows.", "success")
 
+    except ImportError:
+        db.session.rollback()
+        flash("openpyxl module missing.", "danger")
     except Exception as e:
+        db.session.rollback()
         flash(f"Import error: {str(e)}", "danger")
 
     return redirect(url_for("teacher.dashboard"))
@@ -385,14 +352,15 @@ def mass_delete_students():
         for sid in sids:
             u = User.query.get(sid)
             if u and u.role == Role.STUDENT:
-                # Wipe history
-                Attempt.query.filter_by(user_id=u.id).delete()
+                # History goes with the user through ON DELETE CASCADE
+                forget_attempts(Attempt.query.filter_by(user_id=u.id))
                 db.session.delete(u)
                 count += 1
         db.session.commit()
         flash(f"Discharged {count} students from the system.", "success")
     except Exception as e:
         db.session.rollback()
+        current_app.logger.error(f"Student delete error: {e}")
         flash("Error deleting students.", "danger")
 
     return redirect(url_for("teacher.dashboard"))
@@ -408,8 +376,8 @@ def delete_student(uid):
         flash("Cannot delete a non-student user.", "danger")
         return redirect(url_for("teacher.dashboard"))
 
-    # Delete related attempts to avoid integrity errors
-    Attempt.query.filter_by(user_id=u.id).delete()
+    # Attempts, events and state go with the user through ON DELETE CASCADE
+    forget_attempts(Attempt.query.filter_by(user_id=u.id))
     db.session.delete(u)
     db.session.commit()
     flash(f"Student '{u.username}' deleted.", "success")
@@ -446,8 +414,12 @@ def view_student_attempts(uid):
         flash("Not a student.", "danger")
         return redirect(url_for("teacher.dashboard"))
 
-    attempts = Attempt.query.filter_by(user_id=student.id).order_by(Attempt.started_at.desc()).all()
-    return render_template("student_attempts.html", student=student, attempts=attempts)
+    mode = request.args.get("mode")
+    page = page_from_request(Attempt.for_user(student.id, mode), ATTEMPT_ORDER)
+    if wants_json():
+        return jsonify(page.to_dict(Attempt.to_dict))
+    return render_template("student_attempts.html", student=student, attempts=page,
+                           modes=mode_names(), mode=mode, sort=request.args.get("sort"))
 
 
 # --- ANALYTICS LOGIC ---
@@ -461,48 +433,39 @@ def get_analytics_data():
     modes = db.session.query(Attempt.mode, func.count(Attempt.id), func.avg(Attempt.score)).group_by(Attempt.mode).all()
     per_mode = [{"mode": m[0] or "unknown", "count": int(m[1]), "avg": round(float(m[2] or 0), 2)} for m in modes]
 
-    # Question-level accuracy
-    q_stats = {}
-    all_attempts = Attempt.query.filter(Attempt.details.isnot(None)).all()
-    for a in all_attempts:
-        try:
-            events = json.loads(a.details)
-        except Exception:
-            continue
-        for ev in events:
-            qid = ev.get("qid")
-            if not qid: continue
-            rec = q_stats.setdefault(qid, {"seen": 0, "correct": 0})
-            rec["seen"] += 1
-            if ev.get("correct"):
-                rec["correct"] += 1
-
-    question_info = []
-    if q_stats:
-        qids = list(q_stats.keys())
-        qs = Question.query.filter(Question.id.in_(qids)).all()
-        qmap = {q.id: q for q in qs}
-        for qid, rec in q_stats.items():
-            q = qmap.get(qid)
-            prompt = q.prompt if q else f"Q {qid}"
-            diff = q.difficulty if q else 1
-            acc = round((rec["correct"] / rec["seen"]) * 100, 1) if rec["seen"] else 0.0
-            question_info.append({
-                "qid": qid,
-                "prompt": (prompt[:60] + "...") if len(prompt) > 60 else prompt,
-                "difficulty": diff,
-                "seen": rec["seen"],
-                "correct": rec["correct"],
-                "accuracy": acc
-            })
+    # Question-level accuracy, read from the maintained aggregates
+    def question_row(stats, prompt, diff):
+        prompt = prompt if prompt is not None else f"Q {stats.qid}"
+        return {
+            "qid": stats.qid,
+            "prompt": (prompt[:60] + "...") if len(prompt) > 60 else prompt,
+            "difficulty": diff if diff is not None else 1,
+            "seen": stats.seen,
+            "correct": stats.correct,
+            "accuracy": round((stats.correct / stats.seen) * 100, 1)
+        }
+
+    accuracy = QuestionStats.correct * 1.0 / QuestionStats.seen
+    q_rows = (db.session.query(QuestionStats, Question.prompt, Question.difficulty)
+              .outerjoin(Question, Question.id == QuestionStats.qid)
+              .filter(QuestionStats.seen > 0))
+    top_questions = [question_row(*r) for r in
+                     q_rows.order_by(accuracy.desc(), QuestionStats.seen.desc()).limit(5)]
+    bottom_questions = [question_row(*r) for r in
+                        q_rows.order_by(accuracy.asc(), QuestionStats.seen.desc()).limit(5)]
 
     # Difficulty distribution
     diff_buckets = {i: {"seen": 0, "correct": 0} for i in range(1, 11)}
-    for item in question_info:
-        d = item["difficulty"]
+    bucket_rows = (db.session.query(func.coalesce(Question.difficulty, 1),
+                                    func.sum(QuestionStats.seen),
+                                    func.sum(QuestionStats.correct))
+                   .select_from(QuestionStats)
+                   .outerjoin(Question, Question.id == QuestionStats.qid)
+                   .group_by(func.coalesce(Question.difficulty, 1)))
+    for d, seen, correct in bucket_rows:
         d = max(1, min(10, d))
-        diff_buckets[d]["seen"] += item["seen"]
-        diff_buckets[d]["correct"] += item["correct"]
+        diff_buckets[d]["seen"] += int(seen or 0)
+        diff_buckets[d]["correct"] += int(correct or 0)
 
     diff_list = []
     for d in range(1, 11):
@@ -511,17 +474,53 @@ def get_analytics_data():
         acc = round((c / s) * 100, 1) if s else None
         diff_list.append({"difficulty": d, "seen": s, "accuracy": acc})
 
-    # Sort for top/bottom questions
-    top_questions = sorted(question_info, key=lambda x: (-x["accuracy"], -x["seen"]))[:5]
-    bottom_questions = sorted(question_info, key=lambda x: (x["accuracy"], -x["seen"]))[:5]
-
     return {
         "total_attempts": total_attempts,
         "avg_score": avg_score,
         "per_mode": per_mode,
         "diff_list": diff_list,
         "top_questions": top_questions,
-        "bottom_questions": bottom_questions
+        "bottom_questions": bottom_questions,
+        "item_analysis": get_item_analysis_data()
+    }
+
+def get_item_analysis_data(limit=10):
+    """Highlights of the last item-analysis run (see item_analysis.py), or None."""
+    items, responses, computed_at, calibrated = db.session.query(
+        func.count(ItemCalibration.qid), func.sum(ItemCalibration.responses),
+        func.max(ItemCalibration.computed_at), func.count(ItemCalibration.calibrated)).one()
+    if not items:
+        return None
+
+    def item_row(cal, prompt, diff):
+        row = cal.to_dict()
+        prompt = prompt if prompt is not None else f"Q {cal.qid}"
+        row["prompt"] = (prompt[:60] + "...") if len(prompt) > 60 else prompt
+        row["difficulty"] = diff
+        # A wrong selection whose takers outscore the right one's is worth a look
+        best_right = max((d["mean_score"] for d in row["distractors"]
+                          if d["correct"] and d["mean_score"] is not None), default=None)
+        for d in row["distractors"]:
+            d["suspect"] = (not d["correct"] and best_right is not None
+                            and d["mean_score"] is not None and d["mean_score"] >= best_right)
+        return row
+
+    rows = (db.session.query(ItemCalibration, Question.prompt, Question.difficulty)
+            .join(Question, Question.id == ItemCalibration.qid)
+            .filter(ItemCalibration.calibrated.isnot(None)))
+    weakest = rows.filter(ItemCalibration.point_biserial.isnot(None)) \
+                  .order_by(ItemCalibration.point_biserial.asc()).limit(limit)
+    gap = func.abs(ItemCalibration.calibrated - func.coalesce(Question.difficulty, 0))
+    mislevelled = rows.filter(gap > 0).order_by(gap.desc(), ItemCalibration.responses.desc()).limit(limit)
+
+    return {
+        "items": items,
+        "responses": int(responses or 0),
+        "calibrated": calibrated,
+        "mislevelled_count": rows.filter(gap > 0).count(),
+        "computed_at": computed_at.isoformat() if computed_at else None,
+        "weakest": [item_row(*r) for r in weakest],
+        "mislevelled": [item_row(*r) for r in mislevelled],
     }
 
 @teacher_bp.route("/analytics")
@@ -541,6 +540,107 @@ def analytics_json():
     return jsonify(data)
 
 
+@teacher_bp.route("/analytics/items/run", methods=["POST"])
+@login_required
+@teacher_required
+def run_item_analysis():
+    """Recompute item statistics and calibrated difficulties."""
+    try:
+        from item_analysis import analyze_items
+        report = analyze_items()
+        bump_bank_revision()  # the adaptive mode re-reads item difficulties
+        db.session.commit()
+        flash(f"Item analysis: {report.questions} questions, {report.students} students, "
+              f"{report.responses} responses in {report.seconds:.1f}s "
+              f"({report.calibrated} calibrated).", "success")
+    except ImportError:
+        db.session.rollback()
+        flash("numpy module missing. Please install it to run item analysis.", "danger")
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Item analysis error: {e}")
+        flash("Item analysis failed.", "danger")
+    return redirect(url_for("teacher.analytics"))
+
+@teacher_bp.route("/analytics/items/apply", methods=["POST"])
+@login_required
+@teacher_required
+def apply_item_calibration():
+    """Write calibrated difficulties back to the question bank."""
+    changed = ItemCalibration.apply()
+    if changed:
+        bump_bank_revision()
+    db.session.commit()
+    if changed:
+        question_index.invalidate()
+        answer_keys.invalidate()
+    flash(f"Updated the difficulty of {changed} questions.", "success")
+    return redirect(url_for("teacher.analytics"))
+
+
+# --- EXPORT (CSV / JSONL, streamed) ---
+@teacher_bp.route("/export/<kind>")
+@login_required
+@teacher_required
+def export(kind):
+    """
+    Download attempts or answer events. Query params: format (csv|jsonl),
+    uid, mode, since / until (ISO dates, by attempt start), gzip=1.
+    """
+    fmt = request.args.get("format", "csv")
+    if kind not in KINDS or fmt not in FORMATS:
+        flash("Unknown export.", "danger")
+        return redirect(url_for("teacher.manage_attempts"))
+
+    filters = {"user_id": request.args.get("uid", type=int),
+               "mode": request.args.get("mode") or None}
+    try:
+        for name in ("since", "until"):
+            raw = request.args.get(name)
+            filters[name] = datetime.fromisoformat(raw) if raw else None
+    except ValueError:
+        flash("Dates must look like 2024-09-01.", "danger")
+        return redirect(url_for("teacher.manage_attempts"))
+
+    gzipped = request.args.get("gzip") == "1"
+    # The generator runs after this view returns; stream_with_context keeps
+    # the request (and its database session) alive until the last chunk
+    body = stream_with_context(export_stream(kind, fmt, gzip=gzipped, **filters))
+    filename = export_filename(kind, fmt, gzipped)
+    return Response(body, mimetype="application/gzip" if gzipped else FORMATS[fmt],
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
+# --- REQUEST PROFILING (PERF_ENABLED=1, see perf.py) ---
+@teacher_bp.route("/perf")
+@login_required
+@teacher_required
+def perf():
+    recorder = current_app.extensions.get("perf")
+    snapshot = recorder.snapshot() if recorder else None
+    return render_template("teacher_perf.html", perf=snapshot,
+                           profile_rate=current_app.config.get("PERF_PROFILE_RATE", 0))
+
+@teacher_bp.route("/perf/data")
+@login_required
+@teacher_required
+def perf_json():
+    recorder = current_app.extensions.get("perf")
+    if recorder is None:
+        return jsonify({"error": "Profiling is disabled (set PERF_ENABLED=1)"}), 404
+    return jsonify(recorder.snapshot())
+
+@teacher_bp.route("/perf/reset", methods=["POST"])
+@login_required
+@teacher_required
+def perf_reset():
+    recorder = current_app.extensions.get("perf")
+    if recorder is not None:
+        recorder.reset()
+        flash("Timings cleared.", "success")
+    return redirect(url_for("teacher.perf"))
+
+
 # --- ATTEMPTS MANAGEMENT ---
 @teacher_bp.route("/attempts/manage")
 @login_required
@@ -551,26 +651,36 @@ def manage_attempts():
     Optional 'uid' param to filter by specific student.
     """
     uid = request.args.get("uid", type=int)
-    users = {u.id: u.username for u in User.query.all()}
 
     if uid:
         # Show attempts for specific student
         student = User.query.get_or_404(uid)
-        attempts = Attempt.query.filter_by(user_id=uid).order_by(Attempt.started_at.desc()).all()
+        mode = request.args.get("mode")
+        page = page_from_request(Attempt.for_user(uid, mode), ATTEMPT_ORDER)
+        if wants_json():
+            return jsonify(page.to_dict(Attempt.to_dict))
         return render_template("teacher_manage_attempts.html", 
-                               attempts=attempts, 
-                               user_cache=users, 
-                               filtered_student=student)
+                               attempts=page, 
+                               filtered_student=student,
+                               modes=mode_names(), mode=mode,
+                               sort=request.args.get("sort"))
     else:
-        # Summary view (list of students with attempt counts)
-        counts = db.session.query(Attempt.user_id, func.count(Attempt.id)).group_by(Attempt.user_id).all()
-        counts_map = {r[0]: r[1] for r in counts}
-        students = User.query.order_by(User.username).all()
+        # Summary view: a page of students (by username) with attempt counts
+        students = User.query.filter(User.role == Role.STUDENT)
+        prev = request.args.get("prev")
+        page = keyset_page(students, User.username, cursor=prev or request.args.get("next"),
+                           backwards=bool(prev), descending=False)
+        ids = [s.id for s in page]
+        counts_map = dict(db.session.query(Attempt.user_id, func.count(Attempt.id))
+                          .filter(Attempt.user_id.in_(ids))
+                          .group_by(Attempt.user_id)) if ids else {}
+        if wants_json():
+            return jsonify(page.to_dict(lambda u: {"id": u.id, "username": u.username,
+                                                   "attempts": counts_map.get(u.id, 0)}))
         
         return render_template("teacher_manage_attempts.html", 
                                attempts=[], 
-                               user_cache=users, 
-                               students=students, 
+                               students=page, 
                                counts_map=counts_map, 
                                filtered_student=None)
 
@@ -586,7 +696,7 @@ def mass_delete_attempts():
 
     try:
         safe_aids = [int(x) for x in aids]
-        Attempt.query.filter(Attempt.id.in_(safe_aids)).delete(synchronize_session=False)
+        delete_attempts(Attempt.query.filter(Attempt.id.in_(safe_aids)))
         db.session.commit()
         flash(f"Deleted {len(safe_aids)} attempts.", "success")
     except Exception as e:
@@ -603,11 +713,12 @@ def mass_delete_attempts():
 def delete_attempt(aid):
     try:
         a = Attempt.query.get_or_404(aid)
-        db.session.delete(a)
+        delete_attempts(Attempt.query.filter_by(id=a.id))
         db.session.commit()
         flash("Attempt deleted.", "success")
     except Exception as e:
         db.session.rollback()
+        current_app.logger.error(f"Attempt delete error: {e}")
         flash("Error deleting attempt.", "danger")
         
     return redirect(url_for("teacher.manage_attempts"))
@@ -618,11 +729,12 @@ def delete_attempt(aid):
 @teacher_required
 def delete_student_attempts(uid):
     try:
-        Attempt.query.filter_by(user_id=uid).delete()
+        delete_attempts(Attempt.query.filter_by(user_id=uid))
         db.session.commit()
         flash("All logs wiped for student.", "success")
     except Exception as e:
         db.session.rollback()
+        current_app.logger.error(f"Student log wipe error: {e}")
         flash("Error wiping student logs.", "danger")
         
     return redirect(url_for("teacher.manage_attempts"))
\ No newline at end of file
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from app import create_app
+from config import Config
+from extensions import db
+from models import Question, Role, User
+from quiz.leaderboard import leaderboards
+from quiz.modes.common import question_index
+from quiz.modes.irt import item_parameters
+from quiz.scoring import answer_keys
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        ASSETS_BUILD = False
+        WRITE_BEHIND = False
+
+    app = create_app(TestConfig)
+    # The caches are process-wide; start each test from its own database
+    for cache in (question_index, answer_keys, item_parameters, leaderboards):
+        cache.invalidate()
+    yield app
+
+
+def add_questions(n, difficulty=3):
+    """n single-choice questions whose right answer is option "1"; returns their ids."""
+    questions = [Question(prompt=f"Q{i}", difficulty=difficulty, correct_answers="1",
+                          options_json=json.dumps([{"id": "1", "text": "a"},
+                                                   {"id": "2", "text": "b"}]))
+                 for i in range(n)]
+    db.session.add_all(questions)
+    db.session.commit()
+    return [q.id for q in questions]
+
+
+@pytest.fixture
+def student(app):
+    """A test client logged in as a student."""
+    with app.app_context():
+        user = User(username="student", role=Role.STUDENT)
+        user.set_password("pw")
+        db.session.add(user)
+        db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "student", "password": "pw"})
+    return client
@@ -0,0 +1,59 @@
+from extensions import db
+from models import Attempt
+
+from conftest import add_questions
+
+
+def start(client, mode):
+    return client.post("/quiz/api/start_attempt", json={"mode": mode}).get_json()["attempt_id"]
+
+
+def answer(client, attempt_id, qid):
+    return client.post("/quiz/api/submit_answer", json={
+        "attempt_id": attempt_id, "question_id": qid, "selected": ["1"], "time_used": 1})
+
+
+def score(app, attempt_id):
+    with app.app_context():
+        return db.session.get(Attempt, attempt_id).score
+
+
+def test_replayed_answer_is_rejected(app, student):
+    with app.app_context():
+        add_questions(5)
+    aid = start(student, "firststrike")
+    q = student.post("/quiz/api/get_question", json={"attempt_id": aid}).get_json()
+
+    assert answer(student, aid, q["id"]).status_code == 200
+    for _ in range(3):
+        assert answer(student, aid, q["id"]).status_code == 409
+    assert score(app, aid) == 1
+
+
+def test_repeated_id_in_batch_scores_once(app, student):
+    with app.app_context():
+        add_questions(10)
+    aid = start(student, "minuterush")
+    bundle = student.post("/quiz/api/get_questions",
+                          json={"attempt_id": aid, "count": 5}).get_json()["questions"]
+    answers = [{"question_id": q["id"], "selected": ["1"]} for q in bundle]
+    answers.append(answers[0])
+
+    results = student.post("/quiz/api/submit_answers",
+                           json={"attempt_id": aid, "answers": answers}).get_json()["results"]
+    assert [r.get("error") for r in results] == [None] * 5 + ["Question was already answered"]
+    assert score(app, aid) == 5
+
+
+def test_question_served_twice_can_be_answered_twice(app, student):
+    with app.app_context():
+        (qid,) = add_questions(1)
+    aid = start(student, "levelinfinity")
+    served = [student.post("/quiz/api/get_question", json={"attempt_id": aid}).get_json()["id"]
+              for _ in range(2)]
+    assert served == [qid, qid]
+
+    assert answer(student, aid, qid).status_code == 200
+    assert answer(student, aid, qid).status_code == 200
+    assert answer(student, aid, qid).status_code == 409
+    assert score(app, aid) == 2
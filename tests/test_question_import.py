@@ -0,0 +1,24 @@
+from extensions import db
+from models import Question
+from question_import import COLUMNS, import_questions, normalize_difficulty
+
+
+def test_normalize_difficulty():
+    assert normalize_difficulty("4") == 4
+    assert normalize_difficulty(4.0) == 4
+    assert normalize_difficulty("4.0") == 4
+    assert normalize_difficulty("hard") == 1
+    assert normalize_difficulty(15) == 10
+
+
+def test_numeric_xlsx_cells(app):
+    # openpyxl yields floats for cells Excel typed as numbers
+    rows = [(1, COLUMNS), (2, ("2 + 2?", 3.0, 4.0, None, None, 2.0, 7.0))]
+    with app.app_context():
+        report = import_questions(rows)
+        db.session.commit()
+        assert report.added == 1 and not report.skipped
+        q = Question.query.one()
+        assert q.difficulty == 7
+        assert q.correct_answers == "2"
+        assert q.options_json == '[{"id": "1", "text": "3"}, {"id": "2", "text": "4"}]'
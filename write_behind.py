@@ -0,0 +1,214 @@
+# write_behind.py
+# Optional write-behind for answer submits (WRITE_BEHIND=1).
+#
+# The submit routes score answers in memory and answer the student at once.
+# What the answers change (event rows, QuestionStats counters, the attempt's
+# score, ended_at and difficulty, and closing it) is queued as one
+# AnswerBatch per request. A background thread commits queued batches
+# together, every WRITE_BEHIND_FLUSH_MS or once WRITE_BEHIND_BATCH answers
+# are waiting, so many submits share one transaction and one fsync.
+#
+# Guarantees:
+# - Batches of one attempt are applied in submit order (one flusher thread).
+# - Any request that loads an attempt through the quiz routes, and the
+#   results page, first waits until that attempt's queued batches are
+#   committed. Other pages (dashboards, profiles) may lag by one flush.
+# - The queue holds at most WRITE_BEHIND_QUEUE batches. When it is full a
+#   submit waits up to WRITE_BEHIND_BLOCK_S for room and is then refused
+#   (503) without recording anything, so clients slow down instead of the
+#   process buffering without bound.
+# - Pending batches are flushed at interpreter exit.
+#
+# The queue lives in one process: run a single worker process (threads are
+# fine) or sticky sessions, or a student could reach a worker that has not
+# seen their last answers yet.
+
+import atexit
+import queue
+import threading
+import time
+from collections import Counter, namedtuple
+
+from flask import current_app
+
+from extensions import db
+from models import Attempt, QuestionStats
+
+# points: score increment; current_diff/ability/closed_at: None when unchanged
+# ability: (ability, ability_se) of the adaptive mode's estimate
+AnswerBatch = namedtuple("AnswerBatch",
+                         "attempt_id events points current_diff ability ended_at closed_at")
+
+_FLUSH_NOW = object()   # queue marker: someone is waiting, don't wait for the timer
+_STOP = object()
+
+
+class WriteBehindQueue:
+    def __init__(self, app, flush_ms=50, batch=200, maxsize=5000, block_s=5.0):
+        self.app = app
+        self.flush_s = flush_ms / 1000
+        self.batch = batch
+        self.block_s = block_s
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.pending = Counter()            # attempt id -> batches not yet committed
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    # --- request side ---
+    def submit(self, batch):
+        """Queue `batch`; False if the queue stayed full for block_s seconds."""
+        with self.cond:
+            self.pending[batch.attempt_id] += 1
+        try:
+            self.queue.put(batch, timeout=self.block_s)
+        except queue.Full:
+            self._done([batch])
+            return False
+        return True
+
+    def wait_for(self, attempt_id, timeout=None):
+        """Block until every queued batch of `attempt_id` is committed."""
+        with self.cond:
+            if not self.pending[attempt_id]:
+                return True
+        try:
+            self.queue.put_nowait(_FLUSH_NOW)
+        except queue.Full:
+            pass  # a full queue is flushed without waiting for the timer anyway
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending[attempt_id], timeout)
+
+    def wait_all(self, timeout=None):
+        with self.cond:
+            if not +self.pending:
+                return True
+        try:
+            self.queue.put_nowait(_FLUSH_NOW)
+        except queue.Full:
+            pass
+        with self.cond:
+            return self.cond.wait_for(lambda: not +self.pending, timeout)
+
+    def stop(self, timeout=30):
+        """Flush whatever is queued and stop the flusher thread."""
+        if not self.thread.is_alive():
+            return
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+
+    # --- flusher thread ---
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            batches = [] if item is _FLUSH_NOW else [item]
+            stop = self._collect(batches, urgent=item is _FLUSH_NOW)
+            if batches:
+                self._flush(batches)
+            if stop:
+                return
+
+    def _collect(self, batches, urgent):
+        """Gather more batches until the timer, the size limit or a flush request."""
+        deadline = time.monotonic() + self.flush_s
+        answers = sum(len(b.events) for b in batches)
+        while answers < self.batch:
+            if urgent:
+                try:
+                    item = self.queue.get_nowait()   # take what is already queued
+                except queue.Empty:
+                    return False
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    return False
+            if item is _STOP:
+                return True
+            if item is _FLUSH_NOW:
+                urgent = True
+                continue
+            batches.append(item)
+            answers += len(item.events)
+        return False
+
+    def _flush(self, batches):
+        with self.app.app_context():
+            try:
+                for batch in batches:
+                    apply_batch(batch)
+                db.session.commit()
+            except Exception:
+                # One bad batch (e.g. its attempt was deleted meanwhile)
+                # must not take the others down with it
+                db.session.rollback()
+                for batch in batches:
+                    try:
+                        apply_batch(batch)
+                        db.session.commit()
+                    except Exception as e:
+                        db.session.rollback()
+                        self.app.logger.error(
+                            f"write-behind: dropped {len(batch.events)} answers of attempt "
+                            f"{batch.attempt_id}: {e}")
+            finally:
+                self._done(batches)
+
+    def _done(self, batches):
+        with self.cond:
+            for batch in batches:
+                self.pending[batch.attempt_id] -= 1
+                if self.pending[batch.attempt_id] <= 0:
+                    del self.pending[batch.attempt_id]
+            self.cond.notify_all()
+
+
+def apply_batch(batch):
+    """Write one AnswerBatch in the current transaction, as the submit routes would have."""
+    attempt = db.session.get(Attempt, batch.attempt_id)
+    if attempt is None:
+        return  # deleted while queued
+    state = attempt.get_state()
+    for ev in batch.events:
+        db.session.add(ev)
+        QuestionStats.record(ev.qid, ev.correct, ev.time_used, ev.timestamp)
+        state.take_pending(ev.qid)
+    attempt.score = (attempt.score or 0) + batch.points
+    attempt.ended_at = batch.ended_at
+    if batch.current_diff is not None:
+        state.current_diff = batch.current_diff
+    if batch.ability is not None:
+        state.ability, state.ability_se = batch.ability
+    if batch.closed_at is not None:
+        attempt.close(at=batch.closed_at)
+
+
+def write_behind():
+    """The app's WriteBehindQueue, or None when answers are written directly."""
+    return current_app.extensions.get("write_behind")
+
+
+def wait_for_attempt(attempt_id):
+    """Make the attempt's queued answers visible before reading it."""
+    wb = write_behind()
+    if wb is not None:
+        wb.wait_for(attempt_id)
+
+
+def install_write_behind(app):
+    if not app.config.get("WRITE_BEHIND"):
+        app.extensions["write_behind"] = None
+        return None
+    wb = WriteBehindQueue(app,
+                          flush_ms=app.config.get("WRITE_BEHIND_FLUSH_MS", 50),
+                          batch=app.config.get("WRITE_BEHIND_BATCH", 200),
+                          maxsize=app.config.get("WRITE_BEHIND_QUEUE", 5000),
+                          block_s=app.config.get("WRITE_BEHIND_BLOCK_S", 5.0))
+    app.extensions["write_behind"] = wb
+    return wb